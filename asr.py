@@ -0,0 +1,199 @@
+# asr.py — Whisper ASR: model dimuat sekali, audio langsung dari memori (tanpa file temp)
+import os, queue, threading, time
+import numpy as np
+
+from metrics import histogram, timed
+from vad import EnergyVAD, split_speech
+
+WHISPER_SAMPLE_RATE = 16000
+
+# Model dipakai bersama antar sesi; decoding Whisper memasang kv-cache hook di model,
+# jadi transkripsi harus serial
+_transcribe_lock = threading.Lock()
+
+
+def _env_flag(name, default="0"):
+    return os.getenv(name, default).strip().lower() in ("1", "true", "yes", "on")
+
+
+def _to_plain_linear(module):
+    """Whisper memakai subclass ``nn.Linear`` sendiri, quantize_dynamic hanya mengenali
+    ``nn.Linear`` persis, jadi ganti dulu (bobot yang sama, tanpa copy)."""
+    import torch
+
+    for name, child in module.named_children():
+        if isinstance(child, torch.nn.Linear) and type(child) is not torch.nn.Linear:
+            plain = torch.nn.Linear(child.in_features, child.out_features, bias=child.bias is not None)
+            plain.weight = child.weight
+            if child.bias is not None:
+                plain.bias = child.bias
+            setattr(module, name, plain)
+        else:
+            _to_plain_linear(child)
+    return module
+
+
+def load_whisper(model_size=None, int8=None, device=None):
+    """Load model Whisper.
+
+    ``model_size`` default dari VISORA_WHISPER_MODEL ("base"), ``int8`` dari
+    VISORA_WHISPER_INT8. Jalur int8 selalu di CPU (dynamic quantization pada layer Linear).
+    """
+    import torch
+    import whisper
+
+    model_size = model_size or os.getenv("VISORA_WHISPER_MODEL", "base")
+    if int8 is None:
+        int8 = _env_flag("VISORA_WHISPER_INT8")
+    if int8:
+        device = "cpu"
+
+    model = whisper.load_model(model_size, device=device)
+    if int8:
+        model = torch.quantization.quantize_dynamic(
+            _to_plain_linear(model), {torch.nn.Linear}, dtype=torch.qint8
+        )
+    model.eval()
+    print(f"[ASR] Whisper '{model_size}' siap (device={model.device}, int8={bool(int8)})")
+    return model
+
+
+def audiosegment_to_float32(segment) -> np.ndarray:
+    """pydub.AudioSegment (output audiorecorder) -> float32 mono 16 kHz di [-1, 1]."""
+    seg = segment.set_channels(1).set_frame_rate(WHISPER_SAMPLE_RATE).set_sample_width(2)
+    return np.frombuffer(seg.raw_data, dtype=np.int16).astype(np.float32) / 32768.0
+
+
+def transcribe(model, audio: np.ndarray, language=None) -> str:
+    """Transkripsi buffer float32 16 kHz langsung, tanpa lewat ffmpeg/file."""
+    import torch
+
+    if audio.size == 0:
+        return ""
+    fp16 = str(model.device) != "cpu"
+    with _transcribe_lock, torch.inference_mode(), timed("visora_whisper_seconds", "Durasi transkripsi Whisper"):
+        result = model.transcribe(audio, fp16=fp16, language=language)
+    return result["text"].strip()
+
+
+def _resample(audio, sr_from, sr_to=WHISPER_SAMPLE_RATE):
+    if sr_from == sr_to:
+        return audio
+    try:
+        from math import gcd
+
+        from scipy.signal import resample_poly
+
+        g = gcd(int(sr_from), int(sr_to))
+        return resample_poly(audio, sr_to // g, sr_from // g).astype(np.float32)
+    except ImportError:
+        n = int(round(len(audio) * sr_to / sr_from))
+        return np.interp(np.linspace(0, len(audio) - 1, n), np.arange(len(audio)), audio).astype(np.float32)
+
+
+def audioframe_to_float32(frame):
+    """av.AudioFrame (WebRTC, biasanya s16 48 kHz stereo) -> (float32 mono, sample_rate)."""
+    arr = frame.to_ndarray()
+    channels = len(frame.layout.channels)
+    if frame.format.is_planar:
+        arr = arr.reshape(channels, -1).mean(axis=0)
+    else:
+        arr = arr.reshape(-1, channels).mean(axis=1)
+    if np.issubdtype(arr.dtype, np.integer) or frame.format.name.startswith("s16"):
+        arr = arr / 32768.0
+    return arr.astype(np.float32), frame.sample_rate
+
+
+def join_segments(segments, gap_s=0.2, sample_rate=WHISPER_SAMPLE_RATE) -> np.ndarray:
+    """Gabungkan segmen bersuara jadi satu buffer, dipisah hening pendek ``gap_s``."""
+    if not segments:
+        return np.zeros(0, dtype=np.float32)
+    gap = np.zeros(int(sample_rate * gap_s), dtype=np.float32)
+    parts = [segments[0].audio]
+    for seg in segments[1:]:
+        parts += [gap, seg.audio]
+    return np.concatenate(parts)
+
+
+def transcribe_segments(model, audio: np.ndarray, language=None) -> str:
+    """Rekaman utuh: buang hening lewat VAD, lalu transkripsi bagian bersuara dalam satu panggilan.
+
+    Satu panggilan = satu deteksi bahasa dan satu jendela 30 s, bukan satu per jeda antar frasa.
+    """
+    return transcribe(model, join_segments(split_speech(audio, WHISPER_SAMPLE_RATE)), language)
+
+
+class StreamingTranscriber:
+    """Audio mic masuk potongan kecil -> VAD -> Whisper per segmen di thread sendiri.
+
+    VAD jalan di sample rate asli mic (mis. 48 kHz); resample ke 16 kHz dilakukan sekali per
+    segmen, bukan per potongan 20 ms (resample per potongan tanpa state filter merusak tepi tiap potongan).
+
+    Segmen ditranskripsi sambil user masih bicara; saat VAD menandai akhir giliran,
+    ``on_utterance(text, latency_s)`` dipanggil (dari thread transcriber). ``latency_s`` =
+    waktu dari frame bersuara terakhir sampai teks siap (visora_asr_eos_to_text_seconds).
+    """
+
+    def __init__(self, model, on_utterance=None, language=None, **vad_kw):
+        self.model = model
+        self.on_utterance = on_utterance
+        self.language = language
+        self._vad_kw = vad_kw
+        self._sr = WHISPER_SAMPLE_RATE
+        self.vad = EnergyVAD(sample_rate=self._sr, **vad_kw)
+        self._vad_lock = threading.Lock()
+        self._q = queue.Queue()
+        self._parts = []
+        self.last_latency = None
+        self._m_eos = histogram("visora_asr_eos_to_text_seconds", "Akhir ucapan -> transkrip siap")
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def feed(self, audio, sample_rate=WHISPER_SAMPLE_RATE):
+        now = time.time()
+        with self._vad_lock:
+            events = []
+            if sample_rate != self._sr:
+                # Rate mic berubah (jarang): tutup segmen lama, VAD baru di rate baru
+                events = [(k, v, self._sr) for k, v in self.vad.flush(now=now)]
+                self._sr = sample_rate
+                self.vad = EnergyVAD(sample_rate=sample_rate, **self._vad_kw)
+            events += [(k, v, self._sr) for k, v in self.vad.feed(audio, now=now)]
+        for ev in events:
+            self._q.put(ev)
+
+    def flush(self):
+        with self._vad_lock:
+            events = [(k, v, self._sr) for k, v in self.vad.flush(now=time.time())]
+        for ev in events:
+            self._q.put(ev)
+
+    def close(self):
+        self.flush()
+        self._q.put(None)
+
+    def _run(self):
+        while True:
+            ev = self._q.get()
+            if ev is None:
+                return
+            kind, value, sr = ev
+            try:
+                if kind == "segment":
+                    text = transcribe(self.model, _resample(value.audio, sr), self.language)
+                    if text:
+                        self._parts.append(text)
+                elif kind == "turn_end":
+                    text = " ".join(self._parts).strip()
+                    self._parts = []
+                    if not text:
+                        continue
+                    latency = time.time() - value if value is not None else None
+                    if latency is not None:
+                        self.last_latency = latency
+                        self._m_eos.observe(latency)
+                        print(f"[ASR] eos->text {latency * 1000:.0f} ms: {text}")
+                    if self.on_utterance is not None:
+                        self.on_utterance(text, latency)
+            except Exception as e:
+                print(f"[ASR] streaming gagal: {e}")
@@ -0,0 +1,134 @@
+# audio_output.py — satu OutputStream sounddevice yang hidup lama + ring buffer berbasis callback
+#
+#   out = AudioOutput(device=idx)
+#   clip = out.enqueue(data, sr)      # langsung disambung di belakang clip sebelumnya (gapless)
+#   out.wait(clip, stop_check)        # False kalau dihentikan
+#   out.stop()                        # buang semua clip; berhenti di batas buffer berikutnya
+import threading
+from collections import deque
+
+import numpy as np
+import sounddevice as sd
+
+from metrics import counter
+
+
+def resample(data, sr_from, sr_to):
+    """Resample mono float32 sekali per clip (polyphase kalau scipy ada, linear kalau tidak)."""
+    if sr_from == sr_to or len(data) == 0:
+        return data.astype(np.float32, copy=False)
+    try:
+        from math import gcd
+
+        from scipy.signal import resample_poly
+
+        g = gcd(int(sr_from), int(sr_to))
+        return resample_poly(data, int(sr_to) // g, int(sr_from) // g).astype(np.float32)
+    except ImportError:
+        n = int(round(len(data) * sr_to / sr_from))
+        x = np.linspace(0, len(data) - 1, n)
+        return np.interp(x, np.arange(len(data)), data).astype(np.float32)
+
+
+class Clip:
+    __slots__ = ("data", "pos", "done", "cancelled")
+
+    def __init__(self, data):
+        self.data = data
+        self.pos = 0
+        self.done = threading.Event()
+        self.cancelled = False
+
+
+class AudioOutput:
+    """OutputStream yang dibuka sekali; callback mengambil sampel dari antrian clip.
+
+    Device tidak diganti lewat ``sd.default.device`` dan tidak ada open/close per kalimat.
+    Semua clip di-resample ke samplerate device saat ``enqueue``.
+    """
+
+    def __init__(self, device=None, samplerate=None, channels=1, blocksize=512, latency="low"):
+        if samplerate is None:
+            try:
+                samplerate = int(sd.query_devices(device, "output")["default_samplerate"])
+            except Exception:
+                samplerate = 48000
+        self.device = device
+        self.samplerate = int(samplerate)
+        self.channels = channels
+        self.blocksize = blocksize
+        self.block_seconds = blocksize / self.samplerate
+        self._clips = deque()
+        self._lock = threading.Lock()
+        self._m_underflow = counter("visora_audio_underflow_total", "Callback output terlambat (xrun)")
+        self._stream = sd.OutputStream(
+            samplerate=self.samplerate,
+            channels=channels,
+            dtype="float32",
+            blocksize=blocksize,
+            latency=latency,
+            device=device,
+            callback=self._callback,
+        )
+        self._stream.start()
+
+    def _callback(self, outdata, frames, time_info, status):
+        if status.output_underflow:
+            self._m_underflow.inc()
+        filled = 0
+        with self._lock:
+            while filled < frames and self._clips:
+                clip = self._clips[0]
+                n = min(frames - filled, len(clip.data) - clip.pos)
+                outdata[filled:filled + n] = clip.data[clip.pos:clip.pos + n, None]
+                clip.pos += n
+                filled += n
+                if clip.pos >= len(clip.data):
+                    self._clips.popleft()
+                    clip.done.set()
+        if filled < frames:
+            outdata[filled:] = 0
+
+    def enqueue(self, data, sr) -> Clip:
+        """Antrikan audio (mono/stereo float) di belakang clip yang sedang diputar."""
+        data = np.asarray(data, dtype=np.float32)
+        if data.ndim > 1:
+            data = data.mean(axis=1)
+        clip = Clip(resample(data, sr, self.samplerate))
+        with self._lock:
+            self._clips.append(clip)
+        if len(clip.data) == 0:
+            with self._lock:
+                if clip in self._clips:
+                    self._clips.remove(clip)
+            clip.done.set()
+        return clip
+
+    def wait(self, clip, stop_check=None) -> bool:
+        """Tunggu clip selesai. ``stop_check`` dicek tiap satu blok; True -> stop() dan return False."""
+        while not clip.done.wait(self.block_seconds):
+            if stop_check is not None and stop_check():
+                self.stop()
+                return False
+        return not clip.cancelled
+
+    def stop(self):
+        """Buang semua clip; blok yang sudah diserahkan ke device tetap habis (<= blocksize)."""
+        with self._lock:
+            clips = list(self._clips)
+            self._clips.clear()
+        for clip in clips:
+            clip.cancelled = True
+            clip.done.set()
+
+    def pending_seconds(self) -> float:
+        with self._lock:
+            return sum(len(c.data) - c.pos for c in self._clips) / self.samplerate
+
+    def close(self):
+        self.stop()
+        try:
+            self._stream.stop()
+            self._stream.close()
+        except Exception:
+            pass
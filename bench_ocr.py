@@ -0,0 +1,165 @@
+# bench_ocr.py — bandingkan engine OCR (EasyOCR / PaddleOCR) pada set gambar lokal
+#
+# Tiap engine dijalankan di proses terpisah supaya angka memori tidak tercampur.
+# Contoh:
+#   python bench_ocr.py --source signage/ --out bench_ocr.json
+#   python bench_ocr.py --source captures/ --engines paddle --batch 4 --regions
+#   python bench_ocr.py --source captures/ --engines easyocr --mixed   # batch berisi crop beda ukuran
+import argparse
+import json
+import multiprocessing as mp
+import platform
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+IMAGE_EXTS = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
+
+
+def load_crops(source, regions=False, max_images=0, mixed=False):
+    """Gray crop dari tiap gambar: seluruh gambar, atau region teks (``find_text_regions``).
+
+    ``mixed`` memakai keduanya berselang-seling, jadi satu batch berisi baris teks pendek
+    sekaligus gambar besar (kasus terburuk untuk padding ``readtext_batched``)."""
+    from ocr_regions import find_text_regions
+
+    crops = []
+    paths = sorted(p for p in Path(source).iterdir() if p.suffix.lower() in IMAGE_EXTS)
+    if max_images:
+        paths = paths[:max_images]
+    for p in paths:
+        img = cv2.imread(str(p))
+        if img is None:
+            continue
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        if mixed:
+            crops.append(gray)
+        if regions or mixed:
+            for x1, y1, x2, y2 in find_text_regions(gray):
+                crops.append(np.ascontiguousarray(gray[y1:y2, x1:x2]))
+        else:
+            crops.append(gray)
+    return crops
+
+
+def _rss_mb():
+    try:
+        import psutil
+
+        return psutil.Process().memory_info().rss / 2**20
+    except ImportError:
+        from bench_pipeline import peak_rss_mb
+
+        peak = peak_rss_mb()
+        return peak["self"] if peak else None
+
+
+def _bench_engine(engine, args, out_q):
+    """Jalan di proses anak: load engine, warm-up, lalu recognize per batch dan per crop."""
+    try:
+        from ocr_engines import load_ocr_engine
+
+        crops = load_crops(args.source, args.regions, args.max_images, args.mixed)
+        rss0 = _rss_mb()
+        t0 = time.perf_counter()
+        eng = load_ocr_engine(engine=engine, threads=args.threads or None)
+        load_s = time.perf_counter() - t0
+        rss_loaded = _rss_mb()
+        if crops:
+            eng.recognize(crops[:1])
+
+        peak = rss_loaded or 0.0
+        modes = {}
+        # "batched": satu recognize per batch; "per_crop": satu recognize per crop (pembanding)
+        for mode in ("batched", "per_crop"):
+            latencies, chars = [], 0
+            t_all = time.perf_counter()
+            for _ in range(args.repeat):
+                for i in range(0, len(crops), args.batch):
+                    batch = crops[i:i + args.batch]
+                    t = time.perf_counter()
+                    if mode == "batched":
+                        res = eng.recognize(batch)
+                    else:
+                        res = [r for c in batch for r in eng.recognize([c])]
+                    latencies.append((time.perf_counter() - t) * 1000.0)
+                    chars += sum(len(s) for texts in res for s in texts)
+                    rss = _rss_mb()
+                    if rss is not None:
+                        peak = max(peak, rss)
+            total = time.perf_counter() - t_all
+            lat = np.asarray(latencies) if latencies else np.zeros(1)
+            modes[mode] = {
+                "calls": len(latencies),
+                "latency_ms": {
+                    "mean": round(float(lat.mean()), 1),
+                    "p50": round(float(np.percentile(lat, 50)), 1),
+                    "p95": round(float(np.percentile(lat, 95)), 1),
+                },
+                "ms_per_crop": round(1000.0 * total / max(1, len(crops) * args.repeat), 1),
+                "chars": chars,
+                "chars_per_s": round(chars / total, 1) if total else 0.0,
+            }
+        out_q.put({
+            "engine": eng.name,
+            "requested": engine,
+            "crops": len(crops),
+            "batch": args.batch,
+            "mixed": args.mixed,
+            "load_s": round(load_s, 2),
+            **modes,
+            "rss_mb": {
+                "before": round(rss0, 1) if rss0 else None,
+                "loaded": round(rss_loaded, 1) if rss_loaded else None,
+                "peak": round(peak, 1) if peak else None,
+            },
+        })
+    except Exception as e:
+        out_q.put({"requested": engine, "error": repr(e)})
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmark throughput engine OCR")
+    ap.add_argument("--source", required=True, help="folder gambar")
+    ap.add_argument("--engines", default="easyocr,paddle")
+    ap.add_argument("--batch", type=int, default=4, help="crop per panggilan recognize")
+    ap.add_argument("--repeat", type=int, default=2)
+    ap.add_argument("--threads", type=int, default=0)
+    ap.add_argument("--regions", action="store_true", help="OCR region teks, bukan seluruh gambar")
+    ap.add_argument("--mixed", action="store_true", help="seluruh gambar + region teks dalam batch yang sama")
+    ap.add_argument("--max-images", type=int, default=0)
+    ap.add_argument("--out", default=None)
+    args = ap.parse_args(argv)
+
+    ctx = mp.get_context("spawn")
+    results = []
+    for engine in args.engines.split(","):
+        engine = engine.strip()
+        print(f"[BenchOCR] {engine} ...")
+        q = ctx.Queue()
+        p = ctx.Process(target=_bench_engine, args=(engine, args, q))
+        p.start()
+        res = q.get()
+        p.join()
+        results.append(res)
+
+    print(f"{'engine':<10}{'mode':<10}{'load s':>8}{'mean ms':>10}{'p95 ms':>9}{'ms/crop':>9}{'char/s':>9}{'peak MB':>9}")
+    for r in results:
+        if "error" in r:
+            print(f"{r['requested']:<10} gagal: {r['error']}")
+            continue
+        for mode in ("batched", "per_crop"):
+            m = r[mode]
+            print(f"{r['engine']:<10}{mode:<10}{r['load_s']:>8}{m['latency_ms']['mean']:>10}{m['latency_ms']['p95']:>9}"
+                  f"{m['ms_per_crop']:>9}{m['chars_per_s']:>9}{str(r['rss_mb']['peak']):>9}")
+
+    if args.out:
+        report = {"source": args.source, "platform": platform.platform(), "results": results}
+        Path(args.out).write_text(json.dumps(report, indent=2, ensure_ascii=False))
+        print(f"[BenchOCR] hasil -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
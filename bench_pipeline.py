@@ -0,0 +1,211 @@
+# bench_pipeline.py — benchmark offline VideoProcessor (tanpa browser/WebRTC)
+#
+# Contoh:
+#   python bench_pipeline.py --source walkthrough.mp4 --out bench_results.json
+#   python bench_pipeline.py --source captures/ --repeat 30 --keyframe-interval 5
+#   VISORA_DETECTOR_BACKEND=onnx python bench_pipeline.py --source walkthrough.mp4 --out onnx.json
+import argparse
+import json
+import os
+import platform
+import sys
+import threading
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+IMAGE_EXTS = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
+
+
+def iter_frames(source, repeat=1, max_frames=0):
+    """Yield frame BGR dari file video atau folder gambar (tiap gambar diulang ``repeat`` kali)."""
+    source = Path(source)
+    n = 0
+    if source.is_dir():
+        images = sorted(p for p in source.iterdir() if p.suffix.lower() in IMAGE_EXTS)
+        for p in images:
+            img = cv2.imread(str(p))
+            if img is None:
+                continue
+            for _ in range(repeat):
+                yield img
+                n += 1
+                if max_frames and n >= max_frames:
+                    return
+        return
+    cap = cv2.VideoCapture(str(source))
+    if not cap.isOpened():
+        raise SystemExit(f"Tidak bisa membuka {source}")
+    try:
+        while True:
+            ok, img = cap.read()
+            if not ok:
+                return
+            yield img
+            n += 1
+            if max_frames and n >= max_frames:
+                return
+    finally:
+        cap.release()
+
+
+def peak_rss_mb():
+    """Peak RSS proses ini (+ anak, untuk mode inference=process)."""
+    try:
+        import resource
+
+        scale = 1.0 if sys.platform == "darwin" else 1024.0  # macOS: byte, Linux: KB
+        own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 2**20
+        children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale / 2**20
+        return {"self": own, "children": children}
+    except ImportError:
+        pass
+    try:
+        import psutil
+
+        mem = psutil.Process().memory_info()
+        return {"self": getattr(mem, "peak_wset", mem.rss) / 2**20, "children": None}
+    except ImportError:
+        return None
+
+
+def _percentiles(values_ms):
+    if not values_ms:
+        return {"count": 0}
+    arr = np.asarray(values_ms, dtype=np.float64)
+    return {
+        "count": int(arr.size),
+        "mean_ms": float(arr.mean()),
+        "p50_ms": float(np.percentile(arr, 50)),
+        "p90_ms": float(np.percentile(arr, 90)),
+        "p99_ms": float(np.percentile(arr, 99)),
+        "max_ms": float(arr.max()),
+    }
+
+
+def run(args):
+    import av
+
+    from detector_backend import detector_config, load_detector
+    from pipeline import StageTimer
+    from video_processor import VideoProcessor
+
+    det_cfg = detector_config(imgsz=args.imgsz)
+    model = load_detector(args.weights, **det_cfg)
+    names = model.names
+    colors = np.random.default_rng(0).uniform(0, 255, size=(len(names), 3))
+
+    sentences = []
+    sent_lock = threading.Lock()
+
+    def on_sentence(sentence, frame_ts):
+        with sent_lock:
+            sentences.append((time.time() - frame_ts, sentence))
+
+    vp = VideoProcessor(
+        model, names, colors,
+        scene_threshold=args.scene_threshold,
+        keyframe_interval=args.keyframe_interval,
+        inference=args.inference,
+        weights=args.weights,
+        imgsz=det_cfg["imgsz"],
+        on_sentence=on_sentence,
+    )
+    # Simpan semua sampel, bukan hanya jendela 256 terakhir
+    for name in list(vp.timers):
+        vp.timers[name] = StageTimer(window=1_000_000)
+    if vp.service.worker is not None:
+        vp.service.worker.wait_ready(timeout=300)
+
+    recv_ms = []
+    period = 1.0 / args.fps if args.fps > 0 else 0.0
+    fed = 0
+    t_start = time.perf_counter()
+    next_t = t_start
+    for img in iter_frames(args.source, repeat=args.repeat, max_frames=args.max_frames):
+        frame = av.VideoFrame.from_ndarray(img, format="bgr24")
+        t0 = time.perf_counter()
+        vp.recv(frame)
+        recv_ms.append((time.perf_counter() - t0) * 1000.0)
+        fed += 1
+        if period:
+            next_t += period
+            delay = next_t - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+    feed_elapsed = time.perf_counter() - t_start
+    # Biarkan stage deteksi/OCR menyelesaikan frame terakhir
+    time.sleep(args.drain)
+    elapsed = time.perf_counter() - t_start
+
+    stages = vp.stage_stats()
+    for name, timer in vp.timers.items():
+        stages[name] = _percentiles(timer.samples_ms())
+    vp.close()
+
+    with sent_lock:
+        e2e = [lat * 1000.0 for lat, _ in sentences]
+        sample_sentences = [s for _, s in sentences[-5:]]
+
+    detect_count = stages["detect"]["count"]
+    result = {
+        "source": str(args.source),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {
+            "detector": det_cfg,
+            "fps": args.fps,
+            "repeat": args.repeat,
+            "scene_threshold": args.scene_threshold,
+            "keyframe_interval": args.keyframe_interval,
+            "inference": args.inference or os.getenv("VISORA_INFERENCE", "thread"),
+        },
+        "env": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "throughput": {
+            "frames_fed": fed,
+            "feed_fps": fed / feed_elapsed if feed_elapsed else 0.0,
+            "detect_passes": detect_count,
+            "detect_per_s": detect_count / elapsed if elapsed else 0.0,
+            "ocr_passes": stages["ocr"]["count"],
+            "sentences": len(e2e),
+            "elapsed_s": elapsed,
+        },
+        "stages": dict(stages, recv=_percentiles(recv_ms)),
+        "frame_to_sentence": _percentiles(e2e),
+        "peak_rss_mb": peak_rss_mb(),
+        "sample_sentences": sample_sentences,
+    }
+    return result
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmark headless pipeline VideoProcessor")
+    ap.add_argument("--source", required=True, help="file video atau folder gambar")
+    ap.add_argument("--weights", default=str(Path(__file__).parent / "yolo12n.pt"))
+    ap.add_argument("--out", default="bench_results.json")
+    ap.add_argument("--fps", type=float, default=15.0, help="laju umpan frame; 0 = secepatnya")
+    ap.add_argument("--repeat", type=int, default=15, help="ulang tiap gambar (mode folder)")
+    ap.add_argument("--max-frames", type=int, default=0)
+    ap.add_argument("--imgsz", type=int, default=None)
+    ap.add_argument("--scene-threshold", type=float, default=None)
+    ap.add_argument("--keyframe-interval", type=int, default=None)
+    ap.add_argument("--inference", choices=["thread", "process"], default=None)
+    ap.add_argument("--drain", type=float, default=2.0, help="detik menunggu stage selesai setelah frame terakhir")
+    args = ap.parse_args(argv)
+
+    result = run(args)
+    Path(args.out).write_text(json.dumps(result, indent=2, default=float))
+    t = result["throughput"]
+    print(f"[Bench] {t['frames_fed']} frame, detect {t['detect_per_s']:.2f}/s, "
+          f"frame->kalimat p50 {result['frame_to_sentence'].get('p50_ms', float('nan')):.0f} ms, "
+          f"peak RSS {result['peak_rss_mb']}")
+    print(f"[Bench] hasil -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+# bench_tts.py — bandingkan latency dan kualitas mode TTS (fp32 / int8 / int8 + vocoder trace) secara offline
+#
+# Contoh:
+#   python bench_tts.py --out bench_tts.json
+#   python bench_tts.py --modes fp32,int8 --threads 2 --repeat 5 --wav-dir tts_samples/
+import argparse
+import json
+import platform
+import time
+from pathlib import Path
+
+import numpy as np
+
+SR = 16000
+
+# Kalimat tetap: narasi detektor, teks OCR, dan jawaban percakapan yang lebih panjang
+SENTENCES = (
+    "Saya melihat objek person, chair",
+    "Ada person baru, bottle hilang",
+    "Awas, car dekat di depan",
+    "Saya melihat teks EXIT",
+    "There is a person standing near the door, and a bottle on the table.",
+    "The street ahead looks clear, but watch out for the bicycle on your left side.",
+)
+
+MODES = {
+    "fp32": dict(int8=False, trace_vocoder=False),
+    "int8": dict(int8=True, trace_vocoder=False),
+    "int8_trace": dict(int8=True, trace_vocoder=True),
+}
+
+
+def log_spectrum(wav, n_fft=512, hop=128):
+    """Log-magnitude STFT (frame x bin) tanpa dependensi tambahan."""
+    if len(wav) < n_fft:
+        wav = np.pad(wav, (0, n_fft - len(wav)))
+    win = np.hanning(n_fft).astype(np.float32)
+    n = 1 + (len(wav) - n_fft) // hop
+    frames = np.stack([wav[i * hop:i * hop + n_fft] * win for i in range(n)])
+    return np.log10(np.abs(np.fft.rfft(frames, axis=1)) ** 2 + 1e-10)
+
+
+def spectral_distance(ref, test):
+    """Log-spectral distance (dB) pada bagian yang tumpang tindih; 0 = identik."""
+    a, b = log_spectrum(ref), log_spectrum(test)
+    n = min(len(a), len(b))
+    if n == 0:
+        return None
+    return float(np.mean(np.sqrt(np.mean((10 * (a[:n] - b[:n])) ** 2, axis=1))))
+
+
+def run_mode(name, opts, threads, repeat, wav_dir, seed=0):
+    """Prenet SpeechT5 memakai dropout juga saat inferensi, jadi tiap kalimat disintesis dengan seed
+    yang sama di semua mode; ``_wav_alt`` (seed + 1) mengukur variasi sampling mode itu sendiri."""
+    import torch
+    from tts_model import generate, load_bundle
+
+    def seeded(text, s):
+        torch.manual_seed(s)
+        return generate(text, bundle)
+
+    t0 = time.perf_counter()
+    bundle = load_bundle(threads=threads, **opts)
+    load_s = time.perf_counter() - t0
+    generate("warm up", bundle)
+
+    rows = []
+    for text in SENTENCES:
+        times, wav = [], None
+        for _ in range(repeat):
+            t = time.perf_counter()
+            wav = seeded(text, seed)
+            times.append(time.perf_counter() - t)
+        audio_s = len(wav) / SR
+        rows.append({
+            "text": text,
+            "mean_ms": round(1000 * float(np.mean(times)), 1),
+            "p50_ms": round(1000 * float(np.median(times)), 1),
+            "audio_s": round(audio_s, 2),
+            "rtf": round(float(np.mean(times)) / audio_s, 3) if audio_s else None,
+        })
+        if wav_dir is not None:
+            import soundfile as sf
+
+            sf.write(wav_dir / f"{name}_{len(rows):02d}.wav", wav, SR)
+        rows[-1]["_wav"] = wav
+        rows[-1]["_wav_alt"] = seeded(text, seed + 1)
+    return {"mode": name, "load_s": round(load_s, 1), "torch_threads": torch.get_num_threads(), "sentences": rows}
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark latency/kualitas mode TTS SpeechT5")
+    ap.add_argument("--modes", default="fp32,int8,int8_trace", help="Subset dari " + ",".join(MODES))
+    ap.add_argument("--threads", type=int, default=0, help="Thread torch (0 = default)")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--seed", type=int, default=0, help="Seed torch yang sama untuk tiap mode/kalimat")
+    ap.add_argument("--wav-dir", default=None, help="Simpan hasil WAV per mode untuk didengarkan")
+    ap.add_argument("--out", default=None)
+    args = ap.parse_args()
+
+    wav_dir = Path(args.wav_dir) if args.wav_dir else None
+    if wav_dir is not None:
+        wav_dir.mkdir(parents=True, exist_ok=True)
+
+    results = []
+    for name in args.modes.split(","):
+        name = name.strip()
+        if name not in MODES:
+            raise SystemExit(f"Mode tidak dikenal: {name}")
+        print(f"[BenchTTS] {name} ...")
+        results.append(run_mode(name, MODES[name], args.threads or None, args.repeat, wav_dir, args.seed))
+
+    # Kualitas dibandingkan dengan mode pertama (biasanya fp32) pada seed yang sama.
+    # lsd_seed_db = jarak mode itu ke dirinya sendiri dengan seed lain (noise sampling sebagai pembanding).
+    ref = results[0]
+    for res in results:
+        for row, ref_row in zip(res["sentences"], ref["sentences"]):
+            row["lsd_db"] = round(spectral_distance(ref_row["_wav"], row["_wav"]), 2)
+            row["len_ratio"] = round(len(row["_wav"]) / max(1, len(ref_row["_wav"])), 3)
+            row["lsd_seed_db"] = round(spectral_distance(row["_wav"], row["_wav_alt"]), 2)
+    for res in results:
+        for row in res["sentences"]:
+            row.pop("_wav")
+            row.pop("_wav_alt")
+        res["mean_ms"] = round(float(np.mean([r["mean_ms"] for r in res["sentences"]])), 1)
+        res["mean_rtf"] = round(float(np.mean([r["rtf"] for r in res["sentences"] if r["rtf"]])), 3)
+        res["mean_lsd_db"] = round(float(np.mean([r["lsd_db"] for r in res["sentences"]])), 2)
+        res["mean_lsd_seed_db"] = round(float(np.mean([r["lsd_seed_db"] for r in res["sentences"]])), 2)
+
+    print(f"{'mode':<12}{'load s':>8}{'mean ms':>10}{'RTF':>8}{'LSD dB':>9}{'seed LSD':>10}")
+    for res in results:
+        print(f"{res['mode']:<12}{res['load_s']:>8}{res['mean_ms']:>10}{res['mean_rtf']:>8}"
+              f"{res['mean_lsd_db']:>9}{res['mean_lsd_seed_db']:>10}")
+
+    if args.out:
+        report = {"platform": platform.platform(), "processor": platform.processor(),
+                  "repeat": args.repeat, "seed": args.seed, "results": results}
+        Path(args.out).write_text(json.dumps(report, indent=2))
+        print(f"[BenchTTS] hasil -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+# detector_backend.py — pilih runtime YOLO (PyTorch / ONNX Runtime / OpenVINO) lewat konfigurasi
+#
+# Model hasil export di-cache di sebelah file weights, jadi hanya run pertama yang membayar
+# biaya export. Contoh:
+#   VISORA_DETECTOR_BACKEND=openvino VISORA_DETECTOR_PRECISION=int8 VISORA_DETECTOR_THREADS=2
+import os
+import shutil
+from pathlib import Path
+
+BACKENDS = ("torch", "onnx", "openvino")
+PRECISIONS = ("fp32", "fp16", "int8")
+
+
+def detector_config(**overrides) -> dict:
+    """Konfigurasi detektor dari env (VISORA_DETECTOR_*), bisa ditimpa lewat argumen."""
+    cfg = {
+        "backend": os.getenv("VISORA_DETECTOR_BACKEND", "torch").lower(),
+        "imgsz": int(os.getenv("VISORA_DETECTOR_IMGSZ", "640")),
+        "precision": os.getenv("VISORA_DETECTOR_PRECISION", "fp32").lower(),
+        "threads": int(os.getenv("VISORA_DETECTOR_THREADS", "0")) or None,
+        "int8_data": os.getenv("VISORA_DETECTOR_INT8_DATA", "coco8.yaml"),
+    }
+    cfg.update({k: v for k, v in overrides.items() if v is not None})
+    if cfg["backend"] not in BACKENDS:
+        raise ValueError(f"VISORA_DETECTOR_BACKEND harus salah satu {BACKENDS}, bukan {cfg['backend']!r}")
+    if cfg["precision"] not in PRECISIONS:
+        raise ValueError(f"VISORA_DETECTOR_PRECISION harus salah satu {PRECISIONS}, bukan {cfg['precision']!r}")
+    return cfg
+
+
+def exported_path(weights, backend, imgsz, precision) -> Path:
+    weights = Path(weights)
+    tag = f"{weights.stem}_{imgsz}_{precision}"
+    if backend == "onnx":
+        return weights.with_name(f"{tag}.onnx")
+    if backend == "openvino":
+        # ultralytics mengenali model OpenVINO dari akhiran "_openvino_model"
+        return weights.with_name(f"{tag}_openvino_model")
+    return weights
+
+
+def _has_cuda() -> bool:
+    try:
+        import torch
+        return torch.cuda.is_available()
+    except ImportError:
+        return False
+
+
+def _export(weights, cfg) -> Path:
+    from ultralytics import YOLO
+
+    backend, imgsz, precision = cfg["backend"], cfg["imgsz"], cfg["precision"]
+    target = exported_path(weights, backend, imgsz, precision)
+    print(f"[Detector] export {Path(weights).name} -> {target.name} (run pertama saja)")
+
+    model = YOLO(str(weights))
+    if backend == "onnx":
+        out = Path(model.export(format="onnx", imgsz=imgsz, half=precision == "fp16", simplify=True))
+        if precision == "int8":
+            # Export ONNX ultralytics tidak punya int8; pakai dynamic quantization ORT
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+
+            quantize_dynamic(str(out), str(target), weight_type=QuantType.QUInt8)
+            out.unlink()
+        else:
+            shutil.move(str(out), str(target))
+    else:
+        out = Path(model.export(
+            format="openvino",
+            imgsz=imgsz,
+            half=precision == "fp16",
+            int8=precision == "int8",
+            data=cfg["int8_data"] if precision == "int8" else None,
+        ))
+        if target.exists():
+            shutil.rmtree(target)
+        shutil.move(str(out), str(target))
+    return target
+
+
+def _apply_threads(model, cfg, path):
+    """Jumlah thread inferensi. Untuk ONNX/OpenVINO session dibuat ulang setelah warm-up,
+    karena AutoBackend ultralytics tidak menerima opsi thread."""
+    threads = cfg["threads"]
+    if not threads:
+        return
+    import numpy as np
+
+    if cfg["backend"] == "torch":
+        import torch
+        torch.set_num_threads(threads)
+        return
+
+    # Predict pertama membuat predictor + AutoBackend
+    model.predict(np.zeros((cfg["imgsz"], cfg["imgsz"], 3), dtype=np.uint8), imgsz=cfg["imgsz"], verbose=False)
+    backend_model = model.predictor.model
+    try:
+        if cfg["backend"] == "onnx":
+            import onnxruntime as ort
+
+            so = ort.SessionOptions()
+            so.intra_op_num_threads = threads
+            so.inter_op_num_threads = 1
+            backend_model.session = ort.InferenceSession(str(path), so, providers=["CPUExecutionProvider"])
+        else:
+            import openvino as ov
+
+            core = ov.Core()
+            xml = next(Path(path).glob("*.xml"))
+            backend_model.ov_compiled_model = core.compile_model(
+                core.read_model(xml),
+                device_name="CPU",
+                config={"PERFORMANCE_HINT": "LATENCY", "INFERENCE_NUM_THREADS": threads},
+            )
+    except Exception as e:
+        print(f"[Detector] gagal set {threads} thread untuk {cfg['backend']}: {e}")
+
+
+def load_detector(weights, **overrides):
+    """Return model ``ultralytics.YOLO`` untuk backend yang dikonfigurasi.
+
+    Export ONNX/OpenVINO dilakukan sekali lalu di-cache; kalau export gagal,
+    jatuh kembali ke PyTorch supaya aplikasi tetap jalan.
+    """
+    from ultralytics import YOLO
+
+    cfg = detector_config(**overrides)
+    if cfg["backend"] == "onnx" and cfg["precision"] == "fp16" and not _has_cuda():
+        # ultralytics me-reset half=False untuk export di CPU: hasilnya tetap FP32, jadi jangan
+        # di-cache/dilaporkan sebagai fp16
+        print("[Detector] WARNING: ONNX fp16 butuh GPU CUDA, export di CPU selalu FP32; pakai fp32")
+        cfg["precision"] = "fp32"
+    path = Path(weights)
+    if cfg["backend"] != "torch":
+        target = exported_path(weights, cfg["backend"], cfg["imgsz"], cfg["precision"])
+        try:
+            path = target if target.exists() else _export(weights, cfg)
+        except Exception as e:
+            # Bukan sekadar info: backend yang dikonfigurasi tidak dipakai (mis. onnxruntime/openvino
+            # tidak terpasang di kiosk offline)
+            print(f"[Detector] ERROR: backend {cfg['backend']} tidak tersedia ({e}), jatuh ke PyTorch")
+            cfg["backend"], path = "torch", Path(weights)
+
+    model = YOLO(str(path), task="detect")
+    _apply_threads(model, cfg, path)
+    print(f"[Detector] backend={cfg['backend']} precision={cfg['precision']} imgsz={cfg['imgsz']} "
+          f"threads={cfg['threads'] or 'default'} ({path.name})")
+    return model
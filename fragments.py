@@ -0,0 +1,234 @@
+# fragments.py — audio siap pakai untuk kosakata narasi yang tetap (nama kelas YOLO + kata template)
+#
+# Kalimat narasi detektor dibangun dari potongan yang sama ("Ada person baru", "Awas, car dekat
+# di depan"), jadi setiap potongan cukup disintesis sekali lalu disambung dengan crossfade pendek.
+# Teks OCR (bagian setelah "teks") diteruskan apa adanya ke TTS neural, tanpa dipecah/di-lowercase.
+#
+#   python fragments.py --weights yolo12n.pt --out tts_fragments.npz   # build sekali, opsional
+import json
+import re
+import threading
+from io import BytesIO
+
+import numpy as np
+import soundfile as sf
+
+from narration import count_word
+
+# Kata template dari narration (build_sentence, NarrationState) dan alert video_processor
+TEMPLATE_PHRASES = (
+    "Saya melihat", "objek", "teks", "ada", "baru", "hilang", "Awas", "dekat di depan",
+) + tuple(count_word(n) for n in range(2, 10))
+
+_WORD = re.compile(r"[\w']+", re.UNICODE)
+_CLAUSE = re.compile(r"\s*[,;:.!?]\s*")
+# Narasi selalu menaruh teks OCR di bagian terakhir: "..., teks Jl. Sudirman No. 5"
+_OCR_MARKER = re.compile(r"(?:^|(?<=[\s,]))teks\s+", re.IGNORECASE)
+
+
+def _words(text):
+    return tuple(w.lower() for w in _WORD.findall(text))
+
+
+def split_ocr(text):
+    """("Saya melihat objek x, teks", "Jl. Sudirman No. 5"); bagian kedua None kalau tanpa teks OCR."""
+    m = _OCR_MARKER.search(text)
+    if m is None:
+        return text, None
+    return text[:m.end()].rstrip(), text[m.end():].strip() or None
+
+
+def _trim(data, sr, threshold=0.01, pad_ms=10):
+    """Buang hening di awal/akhir hasil SpeechT5 supaya sambungan rapat."""
+    loud = np.flatnonzero(np.abs(data) > threshold)
+    if len(loud) == 0:
+        return data
+    pad = int(sr * pad_ms / 1000)
+    return data[max(0, loud[0] - pad): loud[-1] + pad + 1]
+
+
+class FragmentBank:
+    """Peta frasa (tuple kata, lowercase) -> audio float32 mono pada satu samplerate."""
+
+    def __init__(self, crossfade_ms=15, pause_ms=120):
+        self.crossfade_ms = crossfade_ms
+        self.pause_ms = pause_ms
+        self.sr = None
+        self.max_words = 0
+        self._frags = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._frags)
+
+    def __contains__(self, phrase):
+        return _words(phrase) in self._frags
+
+    def add(self, phrase, data, sr):
+        key = _words(phrase)
+        if not key:
+            return
+        data = np.asarray(data, dtype=np.float32)
+        if data.ndim > 1:
+            data = data.mean(axis=1)
+        with self._lock:
+            if self.sr is None:
+                self.sr = int(sr)
+            elif int(sr) != self.sr:
+                raise ValueError(f"samplerate fragmen {sr} != {self.sr}")
+            self._frags[key] = _trim(data, self.sr)
+            self.max_words = max(self.max_words, len(key))
+
+    def build(self, phrases, synth):
+        """Sintesis frasa yang belum ada. ``synth(text) -> BytesIO WAV``. Return jumlah yang baru."""
+        added = 0
+        for phrase in dict.fromkeys(phrases):
+            if not phrase or phrase in self:
+                continue
+            try:
+                wav = synth(phrase)
+                wav.seek(0)
+                data, sr = sf.read(wav, dtype="float32")
+                self.add(phrase, data, sr)
+                added += 1
+            except Exception as e:
+                print(f"[Fragments] gagal sintesis '{phrase}': {e}")
+        return added
+
+    # ----- penyusunan -----
+    def _plan_clause(self, words):
+        """Greedy longest-match. Return list (True, key) untuk fragmen / (False, [kata...]) untuk sisa."""
+        plan, i = [], 0
+        while i < len(words):
+            for n in range(min(self.max_words, len(words) - i), 0, -1):
+                key = words[i:i + n]
+                if key in self._frags:
+                    plan.append((True, key))
+                    i += n
+                    break
+            else:
+                if plan and not plan[-1][0]:
+                    plan[-1][1].append(words[i])
+                else:
+                    plan.append((False, [words[i]]))
+                i += 1
+        return plan
+
+    def coverage(self, text) -> float:
+        """Porsi kata dalam ``text`` yang tersedia sebagai fragmen (0..1)."""
+        words = _words(text)
+        if not words:
+            return 0.0
+        covered = sum(len(k) for ok, k in self._plan_clause(words) if ok)
+        return covered / len(words)
+
+    def _join(self, pieces):
+        xf = int(self.sr * self.crossfade_ms / 1000)
+        out = None
+        for p in pieces:
+            if out is None:
+                out = p
+                continue
+            n = min(xf, len(out), len(p))
+            if n == 0:
+                out = np.concatenate([out, p])
+                continue
+            ramp = np.linspace(0.0, 1.0, n, dtype=np.float32)
+            mid = out[-n:] * (1.0 - ramp) + p[:n] * ramp
+            out = np.concatenate([out[:-n], mid, p[n:]])
+        return out if out is not None else np.zeros(0, dtype=np.float32)
+
+    def _synth_piece(self, synth, text):
+        wav = synth(text)
+        wav.seek(0)
+        data, sr = sf.read(wav, dtype="float32")
+        if data.ndim > 1:
+            data = data.mean(axis=1)
+        if sr != self.sr:
+            from audio_output import resample
+            data = resample(data, sr, self.sr)
+        return _trim(data, self.sr)
+
+    def render(self, text, synth=None, min_coverage=0.5):
+        """WAV BytesIO: template + nama kelas dari fragmen, teks OCR lewat ``synth`` (BytesIO WAV).
+
+        Teks OCR (lihat ``split_ocr``) disintesis utuh dengan tanda baca/kapitalisasi aslinya.
+        Return None kalau bank kosong, cakupan bagian template di bawah ``min_coverage``, atau ada
+        yang harus disintesis tapi ``synth`` tidak diberikan — pemanggil lalu memakai TTS neural biasa.
+        """
+        head, ocr = split_ocr(text)
+        if not self._frags or not _words(head) or self.coverage(head) < min_coverage:
+            return None
+        if ocr and synth is None:
+            return None
+        pause = np.zeros(int(self.sr * self.pause_ms / 1000), dtype=np.float32)
+        clauses = []
+        for clause in _CLAUSE.split(head):
+            words = _words(clause)
+            if not words:
+                continue
+            pieces = []
+            for ok, key in self._plan_clause(words):
+                if ok:
+                    pieces.append(self._frags[key])
+                    continue
+                if synth is None:
+                    return None
+                pieces.append(self._synth_piece(synth, " ".join(key)))
+            clauses.append(pieces)
+        if not clauses:
+            return None
+        if ocr:
+            # "teks" + isi OCR satu klausa, tanpa jeda di tengah
+            clauses[-1].append(self._synth_piece(synth, ocr))
+        clauses = [self._join(pieces) for pieces in clauses]
+        out = [clauses[0]]
+        for c in clauses[1:]:
+            out += [pause, c]
+        buf = BytesIO()
+        sf.write(buf, np.concatenate(out), samplerate=self.sr, format="WAV")
+        buf.seek(0)
+        return buf
+
+    # ----- disk -----
+    def save(self, path):
+        with self._lock:
+            keys = list(self._frags)
+            arrays = {f"f{i}": self._frags[k] for i, k in enumerate(keys)}
+        np.savez(path, _meta=np.array(json.dumps({"sr": self.sr, "keys": [" ".join(k) for k in keys]})), **arrays)
+
+    def load(self, path) -> int:
+        with np.load(path, allow_pickle=False) as z:
+            meta = json.loads(str(z["_meta"]))
+            for i, phrase in enumerate(meta["keys"]):
+                self.add(phrase, z[f"f{i}"], meta["sr"])
+        return len(meta["keys"])
+
+
+def narration_phrases(class_names):
+    """Semua frasa yang perlu ada di bank untuk nama kelas ``class_names`` (list atau dict YOLO)."""
+    names = class_names.values() if isinstance(class_names, dict) else class_names
+    return list(TEMPLATE_PHRASES) + [str(n) for n in names]
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    ap = argparse.ArgumentParser(description="Pre-sintesis fragmen narasi untuk semua kelas YOLO")
+    ap.add_argument("--weights", default="yolo12n.pt")
+    ap.add_argument("--out", default="tts_fragments.npz")
+    args = ap.parse_args()
+
+    from ultralytics import YOLO
+    from tts_model import synthesize_speech
+
+    bank = FragmentBank()
+    try:
+        bank.load(args.out)
+    except FileNotFoundError:
+        pass
+    t0 = time.perf_counter()
+    n = bank.build(narration_phrases(YOLO(args.weights).names), synthesize_speech)
+    bank.save(args.out)
+    print(f"[Fragments] {n} fragmen baru, total {len(bank)} -> {args.out} ({time.perf_counter() - t0:.1f}s)")
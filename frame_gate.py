@@ -0,0 +1,65 @@
+# frame_gate.py — gate perubahan scene: lewati inferensi YOLO kalau frame hampir sama
+import cv2
+import numpy as np
+
+
+class SceneChangeGate:
+    """Bandingkan thumbnail grayscale kecil dengan frame terakhir yang dideteksi.
+
+    ``method="diff"``: rata-rata selisih absolut piksel (0-255) pada thumbnail.
+    ``method="hash"``: jarak Hamming dHash 64-bit (0-64).
+    Frame dianggap berubah kalau skor >= ``threshold``. ``max_skip`` memaksa
+    deteksi ulang setelah sekian frame berturut-turut dilewati, supaya objek
+    yang masuk pelan-pelan tetap terdeteksi.
+    """
+
+    def __init__(self, threshold=None, method="diff", size=32, max_skip=25):
+        self.method = method
+        self.size = size
+        self.threshold = threshold if threshold is not None else (6.0 if method == "diff" else 6)
+        self.max_skip = max_skip
+        self._ref = None
+        self._run = 0
+        self.checked = 0
+        self.skipped = 0
+        self.last_score = None
+
+    def _signature(self, frame):
+        gray = frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        if self.method == "hash":
+            small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+            return (small[:, 1:] > small[:, :-1]).flatten()
+        small = cv2.resize(gray, (self.size, self.size), interpolation=cv2.INTER_AREA)
+        return cv2.GaussianBlur(small, (3, 3), 0).astype(np.int16)
+
+    def _score(self, sig):
+        if self.method == "hash":
+            return int(np.count_nonzero(sig != self._ref))
+        return float(np.mean(np.abs(sig - self._ref)))
+
+    def changed(self, frame) -> bool:
+        """True kalau frame perlu dideteksi ulang. Referensi hanya diganti saat True."""
+        self.checked += 1
+        sig = self._signature(frame)
+        if self._ref is None:
+            self._ref, self._run = sig, 0
+            return True
+        self.last_score = self._score(sig)
+        if self.last_score >= self.threshold or self._run >= self.max_skip:
+            self._ref, self._run = sig, 0
+            return True
+        self._run += 1
+        self.skipped += 1
+        return False
+
+    def reset(self):
+        self._ref = None
+        self._run = 0
+
+    def stats(self) -> dict:
+        return {
+            "checked": self.checked,
+            "skipped": self.skipped,
+            "skip_rate": (self.skipped / self.checked) if self.checked else 0.0,
+            "last_score": self.last_score,
+        }
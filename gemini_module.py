@@ -1,45 +1,170 @@
 import os
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
-
+import re
+import time
 import warnings
 warnings.filterwarnings('ignore')
 
-import google.generativeai as genai
 from pathlib import Path
+from metrics import histogram, timed
+from response_cache import ResponseCache
 
 api_key = os.getenv('GOOGLE_API_KEY')
 # api_key = "API_KEY"
 
-if not api_key:
-    raise ValueError("GOOGLE_API_KEY not found. Please set it in your .env file or environment variables.")
-
 chain_cache = None
 
+# Cache jawaban per query ternormalisasi; VISORA_GEMINI_CACHE_TTL=0 mematikan
+_cache_ttl = float(os.getenv("VISORA_GEMINI_CACHE_TTL", "3600"))
+response_cache = ResponseCache(
+    ttl=_cache_ttl,
+    max_items=int(os.getenv("VISORA_GEMINI_CACHE_ITEMS", "256")),
+    path=os.getenv("VISORA_GEMINI_CACHE_FILE") or None,
+    wait_timeout=float(os.getenv("VISORA_GEMINI_WAIT_TIMEOUT", "60")),
+) if _cache_ttl > 0 else None
+
+def build_chain(chat_model):
+    """prompt | chat_model | parser. Chat model apa pun (termasuk fake model lokal untuk test)."""
+    from langchain_core.prompts import ChatPromptTemplate
+    from langchain_core.output_parsers import StrOutputParser
+
+    prompt = ChatPromptTemplate.from_messages([
+        ("system", "your system prompt..."),
+        ("user", "{input}")
+    ])
+
+    output_parser = StrOutputParser()
+
+    return prompt | chat_model | output_parser
+
 def load_gemini(api_key):
     global chain_cache
     if chain_cache is None:
+        if not api_key:
+            raise ValueError("GOOGLE_API_KEY not found. Please set it in your .env file or environment variables.")
+        # Import berat (langchain/google SDK) baru saat model pertama kali dipakai
+        import google.generativeai as genai
+        from langchain_google_genai import ChatGoogleGenerativeAI
+
         genai.configure(api_key=api_key)
         chat_model = ChatGoogleGenerativeAI(google_api_key=api_key, model="gemini-2.5-flash", max_output_tokens=300)
+        chain_cache = build_chain(chat_model)
+    return chain_cache
 
-        from langchain_core.prompts import ChatPromptTemplate
-        from langchain_core.output_parsers import StrOutputParser
+def _prepare_input(input_text):
+    if not input_text or not input_text.strip():
+        input_text = "Hello, what can you tell me?"
+    return input_text
 
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", "your system prompt..."),
-            ("user", "{input}")
-        ])
+def gemini_get_response(input_text: str, chain=None, cache=None) -> str:
+    """``cache`` default ``response_cache``; ``False`` = selalu panggil model."""
+    input_text = _prepare_input(input_text)
+    cache = response_cache if cache is None else cache
 
-        output_parser = StrOutputParser()
+    def call():
+        chain_ = chain or load_gemini(api_key)
+        with timed("visora_gemini_seconds", "Durasi gemini_get_response (invoke)"):
+            return chain_.invoke({"input": input_text})
 
-        chain_cache = prompt | chat_model | output_parser
-    return chain_cache
+    if not cache:
+        return call()
+    return cache.get_or_call(input_text, call)
 
-def gemini_get_response(input_text: str) -> str:
-    if not input_text or not input_text.strip():
-        input_text = "Hello, what can you tell me?"
+# ===== Streaming: token -> kalimat, supaya TTS bisa mulai sebelum jawaban selesai =====
+# Akhir kalimat = tanda baca penutup yang diikuti spasi (jadi "3.5" atau "www.x.com" tidak terpotong)
+_SENTENCE_END = re.compile(r'[.!?…]+["\')\]]*\s+|\n+')
+
+def iter_sentences(chunks, min_chars=2):
+    """Kumpulkan potongan token dan yield tiap kalimat begitu lengkap."""
+    buf = ""
+    for chunk in chunks:
+        if not chunk:
+            continue
+        buf += chunk
+        while True:
+            m = _SENTENCE_END.search(buf)
+            if m is None:
+                break
+            sentence = buf[:m.end()].strip()
+            buf = buf[m.end():]
+            if len(sentence) >= min_chars:
+                yield sentence
+    tail = buf.strip()
+    if tail:
+        yield tail
+
+def gemini_stream_response(input_text: str, chain=None):
+    """Yield potongan teks mentah dari ``chain.stream``."""
+    input_text = _prepare_input(input_text)
+    chain = chain or load_gemini(api_key)
+    for chunk in chain.stream({"input": input_text}):
+        yield chunk
+
+def _stream_model_sentences(input_text, chain):
+    t0 = time.perf_counter()
+    first = True
+    for sentence in iter_sentences(gemini_stream_response(input_text, chain=chain)):
+        if first:
+            histogram("visora_gemini_first_sentence_seconds", "Waktu sampai kalimat pertama Gemini").observe(
+                time.perf_counter() - t0)
+            first = False
+        yield sentence
+    histogram("visora_gemini_stream_seconds", "Durasi total jawaban streaming Gemini").observe(
+        time.perf_counter() - t0)
+
+def _restore_audio(cache, input_text, sentences, audio_cache, audio_keys=None):
+    """Audio TTS ikut entry cache: isi ulang cache TTS, atau tempel audio yang sudah disintesis.
+
+    ``audio_keys(kalimat)`` -> key cache TTS yang dibaca player (mis. per klausa di mode streaming).
+    """
+    stored = cache.audio(input_text)
+    for sentence in sentences:
+        for key in (audio_keys(sentence) if audio_keys else [sentence]):
+            wav = stored.get(key)
+            if wav is not None:
+                if audio_cache.get(key) is None:
+                    audio_cache.put(key, wav)
+                continue
+            buf = audio_cache.get(key)
+            if buf is not None:
+                cache.attach_audio(input_text, key, buf)
+
+def gemini_stream_sentences(input_text: str, chain=None, cache=None, audio_cache=None, audio_keys=None):
+    """Yield jawaban Gemini per kalimat sementara model masih generate.
+
+    Query yang sudah pernah dijawab diambil dari ``cache`` (default ``response_cache``, ``False`` =
+    tanpa cache); query identik yang sedang berjalan menunggu hasilnya. ``audio_cache`` (mis.
+    ``realtime_tts.tts_cache``) dipakai untuk menyimpan audio TTS bersama jawaban, dengan key dari
+    ``audio_keys`` (mis. ``realtime_tts.tts_audio_keys``) supaya sama dengan yang dibaca player.
+    """
+    input_text = _prepare_input(input_text)
+    cache = response_cache if cache is None else cache
+    if not cache:
+        yield from _stream_model_sentences(input_text, chain)
+        return
 
-    chain = load_gemini(api_key)
-    response = chain.invoke({"input": input_text})
+    kind, value = cache.claim(input_text)
+    if kind != "lead":
+        try:
+            reply = value if kind == "hit" else cache.wait(value)
+        except Exception:
+            # Panggilan pemimpin gagal/dibatalkan: jalan sendiri tanpa cache
+            yield from _stream_model_sentences(input_text, chain)
+            return
+        sentences = list(iter_sentences([reply]))
+        if audio_cache is not None:
+            _restore_audio(cache, input_text, sentences, audio_cache, audio_keys)
+        yield from sentences
+        return
 
-    return response
\ No newline at end of file
+    # Pemimpin: streaming seperti biasa sambil mengumpulkan jawaban untuk cache
+    t0 = time.perf_counter()
+    parts = []
+    try:
+        for sentence in _stream_model_sentences(input_text, chain):
+            parts.append(sentence)
+            yield sentence
+    except BaseException as e:
+        # Termasuk GeneratorExit (pemanggil berhenti di tengah): jawaban parsial tidak di-cache
+        cache.resolve(input_text, value, error=e if isinstance(e, Exception) else RuntimeError("stream dibatalkan"))
+        raise
+    cache.resolve(input_text, value, " ".join(parts), time.perf_counter() - t0)
\ No newline at end of file
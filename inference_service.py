@@ -0,0 +1,241 @@
+# inference_service.py — satu YOLO + satu OCR reader per proses, dipakai bersama semua sesi WebRTC
+#
+# Tiap sesi (VideoProcessor) mendaftar lalu mengirim frame. Permintaan deteksi bersifat
+# latest-wins per sesi; thread deteksi mengambil permintaan secara round-robin antar sesi dan
+# menggabungkannya jadi satu batch model.predict. OCR dijalankan di thread sendiri, juga round-robin.
+import itertools
+import os
+import threading
+import time
+from collections import deque
+
+from metrics import gauge, histogram, timed
+from tracking import Detection, detections_from_results
+
+
+class _Request:
+    __slots__ = ("frame", "gray", "boxes", "imgsz", "event", "result", "ts")
+
+    def __init__(self, frame, gray=None, boxes=None, imgsz=None):
+        self.frame = frame
+        self.gray = gray
+        self.boxes = boxes
+        self.imgsz = imgsz
+        self.event = threading.Event()
+        self.result = None
+        self.ts = time.time()
+
+    def done(self, result):
+        self.result = result
+        self.event.set()
+
+
+class InferenceService:
+    def __init__(self, model, imgsz=640, conf=0.5, ocr_langs=("id", "en"), max_batch=4,
+                 batch_window=0.01, worker=None):
+        self.model = model
+        self.imgsz = imgsz
+        self.conf = conf
+        self.ocr_langs = list(ocr_langs)
+        self.max_batch = max_batch
+        self.batch_window = batch_window
+        # worker: InferenceWorker (mode proses); None = model lokal di thread service
+        self.worker = worker
+        self._ocr = None
+        self._ocr_lock = threading.Lock()
+
+        self._cv = threading.Condition()
+        self._sessions = []  # urutan round-robin
+        self._det = {}       # sid -> _Request (latest wins)
+        self._ocr_q = {}     # sid -> deque[_Request]
+        self._det_rr = 0
+        self._ocr_rr = 0
+        self._ids = itertools.count(1)
+        self.served = {}
+        self.superseded = 0
+
+        self._m_batch = histogram("visora_service_batch_size", "Jumlah frame per batch deteksi",
+                                  buckets=tuple(range(1, 17)))
+        self._m_sessions = gauge("visora_service_sessions", "Sesi kamera aktif")
+
+        threading.Thread(target=self._detect_loop, daemon=True).start()
+        threading.Thread(target=self._ocr_loop, daemon=True).start()
+
+    # ----- sesi -----
+    def register(self) -> int:
+        with self._cv:
+            sid = next(self._ids)
+            self._sessions.append(sid)
+            self._ocr_q[sid] = deque()
+            self.served[sid] = 0
+            self._m_sessions.set(len(self._sessions))
+        print(f"[Service] sesi #{sid} terdaftar ({len(self._sessions)} aktif)")
+        return sid
+
+    def unregister(self, sid):
+        with self._cv:
+            if sid in self._sessions:
+                self._sessions.remove(sid)
+            stale = [self._det.pop(sid, None)] + list(self._ocr_q.pop(sid, ()))
+            self.served.pop(sid, None)
+            self._m_sessions.set(len(self._sessions))
+        for r in stale:
+            if r is not None:
+                r.done(None)
+
+    # ----- API sesi -----
+    def detect(self, sid, frame, imgsz=None, timeout=10.0):
+        """List Detection untuk frame, atau None kalau ditimpa frame yang lebih baru/timeout."""
+        req = _Request(frame, imgsz=imgsz or self.imgsz)
+        with self._cv:
+            old = self._det.get(sid)
+            self._det[sid] = req
+            self._cv.notify_all()
+        if old is not None:
+            self.superseded += 1
+            old.done(None)
+        return req.result if req.event.wait(timeout) else None
+
+    def ocr(self, sid, frame, gray, boxes, timeout=10.0):
+        """OCR beberapa crop dalam satu panggilan engine: list teks per box, atau None kalau gagal/timeout."""
+        req = _Request(frame, gray, list(boxes))
+        with self._cv:
+            if sid not in self._ocr_q:
+                return None
+            self._ocr_q[sid].append(req)
+            self._cv.notify_all()
+        return req.result if req.event.wait(timeout) else None
+
+    # ----- penjadwalan -----
+    def _take_detect_batch(self):
+        """Ambil maksimal max_batch permintaan, satu per sesi, mulai dari sesi setelah giliran terakhir."""
+        with self._cv:
+            while not self._det:
+                self._cv.wait(timeout=0.5)
+        # Tunggu sebentar supaya sesi lain sempat masuk batch yang sama
+        if self.batch_window > 0 and len(self._det) < min(self.max_batch, len(self._sessions)):
+            time.sleep(self.batch_window)
+        with self._cv:
+            order = self._sessions[self._det_rr:] + self._sessions[:self._det_rr]
+            batch = []
+            for sid in order:
+                req = self._det.get(sid)
+                # Satu batch = satu imgsz; sesi dengan imgsz lain menunggu batch berikutnya
+                if req is not None and (not batch or req.imgsz == batch[0][1].imgsz):
+                    del self._det[sid]
+                    batch.append((sid, req))
+                    if len(batch) >= self.max_batch:
+                        break
+            if batch and self._sessions:
+                last = batch[-1][0]
+                self._det_rr = (self._sessions.index(last) + 1) % len(self._sessions) if last in self._sessions else 0
+            return batch
+
+    def _detect_loop(self):
+        while True:
+            batch = self._take_detect_batch()
+            if not batch:
+                continue
+            self._m_batch.observe(len(batch))
+            try:
+                results = self._run_detect([req.frame for _, req in batch], batch[0][1].imgsz)
+            except Exception as e:
+                print(f"[Service] deteksi gagal: {e}")
+                results = [None] * len(batch)
+            for (sid, req), dets in zip(batch, results):
+                if sid in self.served:
+                    self.served[sid] += 1
+                req.done(dets)
+
+    def _run_detect(self, frames, imgsz):
+        if self.worker is not None:
+            # Worker proses menerima satu frame per slot; tetap round-robin, tanpa batch tensor
+            out = []
+            for f in frames:
+                arr = self.worker.call("detect", f, imgsz)
+                out.append(None if arr is None else [Detection(r[:4], r[4], r[5]) for r in arr])
+            return out
+        with timed("visora_yolo_predict_seconds", "Durasi model.predict"):
+            results = self.model.predict(frames, imgsz=imgsz, conf=self.conf, verbose=False)
+        return [detections_from_results([r]) for r in results]
+
+    def _take_ocr(self):
+        with self._cv:
+            while True:
+                n = len(self._sessions)
+                for i in range(n):
+                    sid = self._sessions[(self._ocr_rr + i) % n]
+                    q = self._ocr_q.get(sid)
+                    if q:
+                        self._ocr_rr = (self._ocr_rr + i + 1) % n
+                        return q.popleft()
+                self._cv.wait(timeout=0.5)
+
+    def _ocr_loop(self):
+        while True:
+            req = self._take_ocr()
+            try:
+                req.done(self._run_ocr(req.frame, req.gray, req.boxes))
+            except Exception as e:
+                print(f"[Service] OCR gagal: {e}")
+                req.done(None)
+
+    def ocr_engine(self):
+        """Engine OCR (VISORA_OCR_ENGINE), dimuat saat pertama dipakai."""
+        with self._ocr_lock:
+            if self._ocr is None:
+                from ocr_engines import load_ocr_engine
+                self._ocr = load_ocr_engine(langs=tuple(self.ocr_langs))
+            return self._ocr
+
+    def _run_ocr(self, frame, gray, boxes):
+        if self.worker is not None:
+            return self.worker.call("ocr", frame, boxes)
+        crops = [gray[y1:y2, x1:x2] for x1, y1, x2, y2 in boxes]
+        engine = self.ocr_engine()
+        with timed("visora_ocr_recognize_seconds", "Durasi recognize per panggilan (semua crop frame)",
+                   engine=engine.name):
+            return engine.recognize(crops)
+
+    def stats(self) -> dict:
+        with self._cv:
+            out = {
+                "sessions": len(self._sessions),
+                "detect_pending": len(self._det),
+                "ocr_pending": sum(len(q) for q in self._ocr_q.values()),
+                "served": dict(self.served),
+                "superseded": self.superseded,
+            }
+        if self.worker is not None:
+            out["worker"] = self.worker.stats()
+        return out
+
+
+# ===== singleton per proses =====
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_inference_service(model, imgsz=640, inference=None, weights=None):
+    """Service bersama untuk semua sesi. Dibuat sekali dengan model pertama yang diberikan."""
+    global _service
+    with _service_lock:
+        if _service is None:
+            inference = inference or os.getenv("VISORA_INFERENCE", "thread")
+            worker = None
+            if inference == "process":
+                from inference_worker import InferenceWorker
+
+                weights = weights or getattr(model, "ckpt_path", None)
+                worker = InferenceWorker(weights, imgsz=imgsz, detector={"imgsz": imgsz})
+            # Model ONNX/OpenVINO diexport dengan batch statis 1
+            from detector_backend import detector_config
+
+            default_batch = "4" if detector_config()["backend"] == "torch" and worker is None else "1"
+            _service = InferenceService(
+                model,
+                imgsz=imgsz,
+                max_batch=int(os.getenv("VISORA_SERVICE_MAX_BATCH", default_batch)),
+                worker=worker,
+            )
+        return _service
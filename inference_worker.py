@@ -0,0 +1,243 @@
+# inference_worker.py — inferensi YOLO/OCR di proses terpisah, frame lewat ring shared memory
+#
+# Frame tidak pernah di-pickle: parent menulis frame ke salah satu slot di blok
+# SharedMemory, lalu hanya (req_id, kind, slot, h, w, payload) yang dikirim ke worker.
+# Hasil kembali sebagai array kecil lewat multiprocessing.Queue.
+import atexit
+import itertools
+import multiprocessing as mp
+import queue
+import threading
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+
+class FrameRing:
+    """Blok shared memory berisi ``slots`` frame uint8 berukuran maksimum ``max_shape``."""
+
+    def __init__(self, slots=4, max_shape=(1080, 1920, 3), name=None):
+        self.slots = slots
+        self.max_shape = tuple(max_shape)
+        self.slot_bytes = int(np.prod(self.max_shape))
+        self._owner = name is None
+        if self._owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=self.slot_bytes * slots)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self._arr = np.ndarray((slots,) + self.max_shape, dtype=np.uint8, buffer=self.shm.buf)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def fits(self, frame) -> bool:
+        h, w = frame.shape[:2]
+        return frame.ndim == 3 and h <= self.max_shape[0] and w <= self.max_shape[1] \
+            and frame.shape[2] == self.max_shape[2]
+
+    def write(self, slot, frame):
+        h, w = frame.shape[:2]
+        np.copyto(self._arr[slot, :h, :w], frame)
+        return h, w
+
+    def view(self, slot, h, w):
+        return self._arr[slot, :h, :w]
+
+    def close(self):
+        self._arr = None
+        try:
+            self.shm.close()
+            if self._owner:
+                self.shm.unlink()
+        except Exception:
+            pass
+
+
+# ========= Sisi worker (proses anak) =========
+def _load_detector(cfg):
+    from detector_backend import load_detector
+    return load_detector(cfg["weights"], **cfg["detector"])
+
+
+def _worker_main(ring_name, slots, max_shape, jobs, results, cfg):
+    import cv2
+
+    ring = FrameRing(slots, max_shape, name=ring_name)
+    model = _load_detector(cfg)
+    ocr_engine = None
+    results.put((None, "ready", None))
+
+    while True:
+        job = jobs.get()
+        if job is None:
+            break
+        req_id, kind, slot, h, w, payload = job
+        try:
+            frame = ring.view(slot, h, w)
+            if kind == "detect":
+                # payload = imgsz per request (controller adaptif), default dari config
+                res = model.predict(frame, imgsz=payload or cfg["imgsz"], conf=cfg["conf"], verbose=False)
+                out = np.zeros((0, 6), dtype=np.float32)
+                if res and res[0].boxes is not None:
+                    b = res[0].boxes
+                    out = np.concatenate([
+                        b.xyxy.cpu().numpy(),
+                        b.cls.cpu().numpy()[:, None],
+                        b.conf.cpu().numpy()[:, None],
+                    ], axis=1).astype(np.float32)
+                results.put((req_id, "ok", out))
+            elif kind == "ocr":
+                if ocr_engine is None:
+                    from ocr_engines import load_ocr_engine
+                    ocr_engine = load_ocr_engine(langs=tuple(cfg["ocr_langs"]))
+                gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+                crops = [gray[y1:y2, x1:x2] for x1, y1, x2, y2 in payload]
+                results.put((req_id, "ok", ocr_engine.recognize(crops)))
+            else:
+                results.put((req_id, "error", f"unknown job {kind}"))
+        except Exception as e:
+            results.put((req_id, "error", repr(e)))
+    ring.close()
+
+
+# ========= Sisi parent =========
+class _Pending:
+    __slots__ = ("slot", "event", "status", "value")
+
+    def __init__(self, slot):
+        self.slot = slot
+        self.event = threading.Event()
+        self.status = None
+        self.value = None
+
+
+class InferenceWorker:
+    """Client proses inferensi. ``call()`` blocking per request, aman dipanggil dari banyak thread.
+
+    Kalau proses worker mati, semua request yang sedang jalan gagal (return None),
+    slot dibebaskan, dan worker dinyalakan ulang.
+    """
+
+    def __init__(self, weights, slots=4, max_shape=(1080, 1920, 3), imgsz=640, conf=0.5,
+                 ocr_langs=("id", "en"), detector=None):
+        self.cfg = {
+            "weights": str(weights), "imgsz": imgsz, "conf": conf, "ocr_langs": tuple(ocr_langs),
+            # override detector_config() untuk load_detector di proses worker
+            "detector": dict(detector or {}),
+        }
+        self._ctx = mp.get_context("spawn")
+        self.ring = FrameRing(slots, max_shape)
+        self._free = list(range(slots))
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._ready = threading.Event()
+        self._closed = False
+        self.dropped = 0
+        self.restarts = 0
+        self.failed = 0
+        self._proc = None
+        self._spawn()
+        threading.Thread(target=self._dispatch_loop, daemon=True).start()
+        atexit.register(self.close)
+
+    def _spawn(self):
+        self._ready.clear()
+        self._jobs = self._ctx.Queue()
+        self._results = self._ctx.Queue()
+        self._proc = self._ctx.Process(
+            target=_worker_main,
+            args=(self.ring.name, self.ring.slots, self.ring.max_shape, self._jobs, self._results, self.cfg),
+            daemon=True,
+        )
+        self._proc.start()
+        print(f"[Infer] worker pid={self._proc.pid} dimulai")
+
+    def _fail_all(self, reason):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._free = list(range(self.ring.slots))
+        for p in pending.values():
+            p.status, p.value = "error", reason
+            p.event.set()
+        self.failed += len(pending)
+
+    def _dispatch_loop(self):
+        backoff = 0.5
+        while not self._closed:
+            try:
+                req_id, status, value = self._results.get(timeout=0.2)
+            except queue.Empty:
+                if not self._closed and not self._proc.is_alive():
+                    print(f"[Infer] worker mati (exitcode={self._proc.exitcode}), restart dalam {backoff:.1f}s")
+                    self._fail_all("worker crashed")
+                    time.sleep(backoff)
+                    backoff = min(backoff * 2, 10.0)
+                    self.restarts += 1
+                    self._spawn()
+                continue
+            except (EOFError, OSError):
+                continue
+            if req_id is None:
+                self._ready.set()
+                backoff = 0.5
+                continue
+            with self._lock:
+                p = self._pending.pop(req_id, None)
+                if p is not None:
+                    self._free.append(p.slot)
+            if p is not None:
+                p.status, p.value = status, value
+                p.event.set()
+
+    def call(self, kind, frame, payload=None, timeout=10.0):
+        """Jalankan ``kind`` ("detect"/"ocr") pada frame. Return hasil atau None (drop/timeout/error)."""
+        if self._closed or not self._ready.is_set() or not self.ring.fits(frame):
+            self.dropped += 1
+            return None
+        with self._lock:
+            if not self._free:
+                self.dropped += 1
+                return None
+            slot = self._free.pop()
+            req_id = next(self._ids)
+            p = self._pending[req_id] = _Pending(slot)
+        h, w = self.ring.write(slot, frame)
+        self._jobs.put((req_id, kind, slot, h, w, payload))
+        # Kalau timeout, slot tetap milik request ini sampai hasilnya datang/worker restart
+        if not p.event.wait(timeout) or p.status != "ok":
+            if p.status == "error":
+                print(f"[Infer] {kind} gagal: {p.value}")
+            return None
+        return p.value
+
+    def wait_ready(self, timeout=None) -> bool:
+        return self._ready.wait(timeout)
+
+    def stats(self) -> dict:
+        with self._lock:
+            depth = len(self._pending)
+        return {
+            "alive": bool(self._proc and self._proc.is_alive()),
+            "ready": self._ready.is_set(),
+            "queue_depth": depth,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "restarts": self.restarts,
+        }
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self._jobs.put(None)
+            self._proc.join(timeout=2.0)
+            if self._proc.is_alive():
+                self._proc.terminate()
+        except Exception:
+            pass
+        self._fail_all("closed")
+        self.ring.close()
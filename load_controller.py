@@ -0,0 +1,108 @@
+# load_controller.py — kontrol adaptif interval deteksi, ukuran input dan OCR berdasarkan beban
+import os
+import threading
+import time
+
+from metrics import gauge
+
+
+class AdaptiveController:
+    """Feedback controller sederhana untuk menjaga latency frame -> hasil di bawah ``target_latency``.
+
+    Tiap ``adjust_every`` detik controller melihat EMA latency per pass dan pemakaian CPU
+    proses (``process_time`` vs waktu dinding, dibagi jumlah core). Kalau kelebihan beban,
+    tuas diturunkan berurutan: interval deteksi diperlambat, imgsz diturunkan, lalu OCR dimatikan.
+    Kalau longgar, urutannya dibalik.
+    """
+
+    def __init__(self, target_latency=0.5, imgsz_ladder=(640, 512, 416, 320), min_interval=0.05,
+                 max_interval=1.0, interval=0.2, cpu_high=0.85, cpu_low=0.5, adjust_every=2.0,
+                 ema=0.3):
+        self.target_latency = target_latency
+        self.imgsz_ladder = tuple(imgsz_ladder)
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.cpu_high = cpu_high
+        self.cpu_low = cpu_low
+        self.adjust_every = adjust_every
+        self.ema = ema
+
+        self.interval = interval
+        self.level = 0
+        self.ocr_enabled = True
+        self.latency = None
+        self.cpu = 0.0
+        self.last_action = "start"
+
+        self._lock = threading.Lock()
+        self._t_wall = time.perf_counter()
+        self._t_cpu = time.process_time()
+        self._ncpu = os.cpu_count() or 1
+
+        self._m_interval = gauge("visora_ctrl_interval_seconds", "Interval deteksi saat ini")
+        self._m_imgsz = gauge("visora_ctrl_imgsz", "imgsz deteksi saat ini")
+        self._m_ocr = gauge("visora_ctrl_ocr_enabled", "OCR aktif (1) atau dimatikan (0)")
+        self._publish()
+
+    @property
+    def imgsz(self):
+        return self.imgsz_ladder[self.level]
+
+    def observe(self, latency):
+        """Catat latency satu pass (detik) lalu sesuaikan tuas bila sudah waktunya."""
+        with self._lock:
+            self.latency = latency if self.latency is None else self.ema * latency + (1 - self.ema) * self.latency
+            now = time.perf_counter()
+            if now - self._t_wall < self.adjust_every:
+                return
+            cpu_now = time.process_time()
+            self.cpu = (cpu_now - self._t_cpu) / ((now - self._t_wall) * self._ncpu)
+            self._t_wall, self._t_cpu = now, cpu_now
+            self._adjust()
+
+    def _adjust(self):
+        over = self.latency > self.target_latency or self.cpu > self.cpu_high
+        under = self.latency < 0.5 * self.target_latency and self.cpu < self.cpu_low
+        action = None
+        if over:
+            if self.interval < self.max_interval:
+                self.interval = min(self.max_interval, self.interval * 1.5)
+                action = f"interval -> {self.interval:.2f}s"
+            elif self.level < len(self.imgsz_ladder) - 1:
+                self.level += 1
+                action = f"imgsz -> {self.imgsz}"
+            elif self.ocr_enabled:
+                self.ocr_enabled = False
+                action = "OCR off"
+        elif under:
+            if not self.ocr_enabled:
+                self.ocr_enabled = True
+                action = "OCR on"
+            elif self.level > 0:
+                self.level -= 1
+                action = f"imgsz -> {self.imgsz}"
+            elif self.interval > self.min_interval:
+                self.interval = max(self.min_interval, self.interval / 1.5)
+                action = f"interval -> {self.interval:.2f}s"
+        if action:
+            self.last_action = action
+            self._publish()
+            print(f"[CTRL] {action} (latency {self.latency * 1000:.0f} ms, cpu {self.cpu:.0%}, "
+                  f"target {self.target_latency * 1000:.0f} ms)")
+
+    def _publish(self):
+        self._m_interval.set(self.interval)
+        self._m_imgsz.set(self.imgsz)
+        self._m_ocr.set(1 if self.ocr_enabled else 0)
+
+    def decisions(self) -> dict:
+        with self._lock:
+            return {
+                "interval_s": round(self.interval, 3),
+                "imgsz": self.imgsz,
+                "ocr_enabled": self.ocr_enabled,
+                "latency_ms": round(self.latency * 1000, 1) if self.latency is not None else None,
+                "cpu": round(self.cpu, 3),
+                "target_ms": round(self.target_latency * 1000),
+                "last_action": self.last_action,
+            }
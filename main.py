@@ -1,27 +1,31 @@
 import streamlit as st
+import os
+import threading
 import time
-import tempfile
 from pathlib import Path
 import numpy as np
 
-# Video Library
-from streamlit_webrtc import webrtc_streamer
-from video_processor import VideoProcessor
-from realtime_tts import start_tts_worker, pause_tts, resume_tts
+# Modul di sini ringan; torch/ultralytics/whisper/transformers/easyocr/langchain baru di-import
+# oleh thread warm-up (warmup.py) atau saat fitur pertama kali dipakai, jadi UI langsung tampil.
+from realtime_tts import start_tts_worker, pause_tts, resume_tts, speak_reply, warm_fragments, tts_ready, tts_busy, tts_cache, tts_audio_keys
 
 # Audio & LLM Library
-import whisper
+from asr import load_whisper, audiosegment_to_float32, audioframe_to_float32, transcribe_segments, StreamingTranscriber
 from audiorecorder import audiorecorder
-from tts_model import synthesize_speech
-from realtime_tts import start_tts_worker
-from gemini_module import gemini_get_response
+from gemini_module import gemini_stream_sentences, load_gemini, api_key, response_cache
 
 # YOLO
-from ultralytics import YOLO
+from detector_backend import detector_config, load_detector
+
+# Warm-up latar
+from warmup import Warmup
 
 # Result Queue
 from queue import Queue
 
+# Metrics
+from metrics import REGISTRY, start_metrics_server
+
 # state variables
 if "result_queue" not in st.session_state:
     st.session_state.result_queue = Queue(maxsize=5)
@@ -44,18 +48,94 @@ if "last_sentence" not in st.session_state:
 
 st.title("VISORA")
 
+# Endpoint Prometheus lokal, sekali per proses
+@st.cache_resource
+def _metrics_server():
+    return start_metrics_server(
+        port=int(os.getenv("VISORA_METRICS_PORT", "9108")),
+        host=os.getenv("VISORA_METRICS_HOST", "127.0.0.1"),
+    )
+
+_metrics_server()
+
+with st.sidebar.expander("📊 Metrics", expanded=False):
+    if st.button("Refresh metrics"):
+        pass  # klik tombol = rerun, tabel dibaca ulang
+    if response_cache is not None:
+        st.caption("Gemini response cache")
+        st.json(response_cache.stats())
+    rows = REGISTRY.snapshot()
+    if rows:
+        st.dataframe(rows, hide_index=True, use_container_width=True)
+    else:
+        st.caption("Belum ada data")
+
 # Load YOLO Model
 ROOT = Path(__file__).parent
 YOLO_WEIGHTS = ROOT / "yolo12n.pt"
+# Backend/precision/imgsz/threads dari env VISORA_DETECTOR_* (lihat detector_backend.py)
+DETECTOR_CFG = detector_config()
+
+# Whisper dimuat sekali dan dipakai bersama oleh semua rerun/sesi
+WHISPER_MODEL = os.getenv("VISORA_WHISPER_MODEL", "base")
+WHISPER_INT8 = os.getenv("VISORA_WHISPER_INT8", "0").lower() in ("1", "true", "yes", "on")
 
-@st.cache_resource
 def load_yolo():
-    model = YOLO(str(YOLO_WEIGHTS))
+    model = load_detector(YOLO_WEIGHTS, **DETECTOR_CFG)
     names = model.names
     colors = np.random.uniform(0, 255, size=(len(names), 3))
     return model, names, colors
 
-yolo_model, CLASS_NAMES, Colors = load_yolo()
+def _warm_ocr(warm):
+    from inference_service import get_inference_service
+
+    model = warm.result("yolo")[0]
+    service = get_inference_service(model, imgsz=DETECTOR_CFG["imgsz"], weights=str(YOLO_WEIGHTS))
+    if service.worker is None:
+        service.ocr_engine()
+        return
+    # VISORA_INFERENCE=process: OCR jalan di worker, jangan muat reader kedua di proses Streamlit.
+    # Job OCR tanpa box cukup untuk memuat engine di worker.
+    if not service.worker.wait_ready(timeout=600):
+        raise TimeoutError("inference worker belum siap")
+    if service.worker.call("ocr", np.zeros((32, 32, 3), dtype=np.uint8), [], timeout=600) is None:
+        raise RuntimeError("OCR di inference worker gagal dimuat")
+
+def _warm_tts(warm):
+    # Model TTS dimuat oleh health check thread worker; di sini cukup menunggu
+    if not tts_ready.wait(timeout=600):
+        raise TimeoutError("TTS worker belum siap")
+    warm_fragments(warm.result("yolo")[1])
+
+# Semua model dimuat sekali per proses, berurutan di thread latar; urutan = prioritas
+@st.cache_resource
+def get_warmup():
+    warm = Warmup()
+    warm.add("yolo", load_yolo, "YOLO detector")
+    warm.add("asr", lambda: load_whisper(WHISPER_MODEL, int8=WHISPER_INT8), "Whisper ASR")
+    warm.add("ocr", lambda: _warm_ocr(warm), "OCR engine")
+    warm.add("tts", lambda: _warm_tts(warm), "SpeechT5 TTS")
+    warm.add("gemini", lambda: load_gemini(api_key) if api_key else None, "Gemini")
+    return warm.start()
+
+WARMUP = get_warmup()
+
+_STATE_ICON = {"pending": "⏳", "loading": "🔄", "ready": "✅", "error": "❌"}
+
+# Panel kesiapan: refresh sendiri tiap detik selama warm-up masih berjalan
+@st.fragment(run_every=None if WARMUP.done() else 1.0)
+def _readiness_panel():
+    st.progress(WARMUP.progress(), text="Model siap" if WARMUP.done() else "Memuat model...")
+    for t in WARMUP.status():
+        line = f"{_STATE_ICON[t['state']]} {t['label']}"
+        if t["seconds"] is not None:
+            line += f" ({t['seconds']}s)"
+        if t["error"]:
+            line += f" — {t['error']}"
+        st.caption(line)
+
+with st.sidebar:
+    _readiness_panel()
 
 # Speech Interaction
 st.subheader("🎤 Voice Interaction")
@@ -63,15 +143,80 @@ st.subheader("🎤 Voice Interaction")
 audio = audiorecorder("Record")
 
 if len(audio) > 0:
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tmp:
-        audio.export(tmp.name, format="wav")
+    samples = audiosegment_to_float32(audio)
 
+    if not WARMUP.ready("asr"):
+        with st.spinner("Menunggu model Whisper..."):
+            WARMUP.result("asr")
     with st.spinner("Transcribing..."):
-        text = whisper.load_model("base").transcribe(tmp.name)["text"]
+        # Hening di awal/akhir/antar kalimat dibuang lewat VAD sebelum Whisper
+        text = transcribe_segments(WARMUP.result("asr"), samples)
+
+    st.markdown(f"**Anda:** {text}")
+
+    # Tiap kalimat langsung ke TTS worker selagi Gemini masih generate
+    reply_box = st.empty()
+    response = ""
+    for sentence in gemini_stream_sentences(text, audio_cache=tts_cache, audio_keys=tts_audio_keys):
+        speak_reply(sentence)
+        response = (response + " " + sentence).strip()
+        reply_box.markdown(f"**VISORA:** {response}")
+
+# ===== Live voice: VAD + transkripsi per segmen selagi user masih bicara =====
+def _reply_to(text, latency, history):
+    """Dipanggil dari thread transcriber saat giliran bicara selesai."""
+    response = ""
+    for sentence in gemini_stream_sentences(text, audio_cache=tts_cache, audio_keys=tts_audio_keys):
+        speak_reply(sentence)
+        response = (response + " " + sentence).strip()
+    history.append({"you": text, "visora": response, "eos_to_text_ms": round(latency * 1000) if latency else None})
+
+live_voice = st.toggle("🎙️ Live voice (tanpa tombol rekam)")
+if live_voice:
+    from collections import deque
+    from streamlit_webrtc import webrtc_streamer, WebRtcMode
+
+    if "voice_history" not in st.session_state:
+        st.session_state.voice_history = deque(maxlen=20)
+    if "live_transcriber" not in st.session_state:
+        if not WARMUP.ready("asr"):
+            with st.spinner("Menunggu model Whisper..."):
+                WARMUP.result("asr")
+        history = st.session_state.voice_history
+        st.session_state.live_transcriber = StreamingTranscriber(
+            WARMUP.result("asr"),
+            # Gemini + TTS di thread sendiri supaya segmen berikutnya tetap ditranskripsi
+            on_utterance=lambda text, latency: threading.Thread(
+                target=_reply_to, args=(text, latency, history), daemon=True
+            ).start(),
+        )
+    transcriber = st.session_state.live_transcriber
 
-    response = gemini_get_response(text)
-    out_audio = synthesize_speech(response)
-    st.audio(out_audio, autoplay=True)
+    def _on_audio(frame):
+        # Half-duplex: suara TTS sendiri tidak ikut ditranskripsi
+        if not tts_busy.is_set():
+            samples, sr = audioframe_to_float32(frame)
+            transcriber.feed(samples, sr)
+        return frame
+
+    webrtc_streamer(
+        key="voice",
+        mode=WebRtcMode.SENDRECV,
+        audio_frame_callback=_on_audio,
+        media_stream_constraints={"audio": {"echoCancellation": True, "noiseSuppression": True}, "video": False},
+        audio_html_attrs={"muted": True},
+        rtc_configuration={"iceServers": [{"urls": ["stun:stun.l.google.com:19302"]}]},
+    )
+
+    @st.fragment(run_every=1.0)
+    def _voice_log():
+        for turn in reversed(st.session_state.voice_history):
+            st.markdown(f"**Anda:** {turn['you']}")
+            st.markdown(f"**VISORA:** {turn['visora']}")
+            if turn["eos_to_text_ms"] is not None:
+                st.caption(f"akhir ucapan → transkrip: {turn['eos_to_text_ms']} ms")
+
+    _voice_log()
 
 # Camera Mode
 st.subheader("📷 Camera (Detection + OCR)")
@@ -93,12 +238,22 @@ if stop:
 
 # ===== CAMERA =====
 if st.session_state.camera_active:
+    from streamlit_webrtc import webrtc_streamer
+    from video_processor import VideoProcessor
+
+    if not WARMUP.ready("yolo"):
+        with st.spinner("Menunggu model YOLO..."):
+            WARMUP.result("yolo")
+    yolo_model, CLASS_NAMES, Colors = WARMUP.result("yolo")
+
     ctx = webrtc_streamer(
         key="visora",
         video_processor_factory=lambda: VideoProcessor(
             yolo_model,
             CLASS_NAMES,
             Colors,
+            weights=str(YOLO_WEIGHTS),
+            imgsz=DETECTOR_CFG["imgsz"],
         ),
         media_stream_constraints={
             "video": {
@@ -117,5 +272,10 @@ if st.session_state.camera_active:
     if ctx and ctx.state.playing:
         resume_tts()
         st.success("📡 Kamera aktif – deteksi berjalan")
+
+        vp = ctx.video_processor
+        if vp is not None and vp.controller is not None:
+            with st.sidebar.expander("⚙️ Load controller", expanded=False):
+                st.json(vp.controller.decisions())
 else:
     st.info("Klik **Open Camera** untuk memulai")
\ No newline at end of file
@@ -0,0 +1,224 @@
+# metrics.py — registry metrik ringan (counter, gauge, histogram latency) + export format Prometheus
+#
+#   from metrics import counter, histogram, timed
+#   with timed("visora_yolo_predict_seconds"):
+#       model.predict(...)
+#   counter("visora_speech_dropped_total").inc()
+#
+# Endpoint teks Prometheus: start_metrics_server() -> http://127.0.0.1:9108/metrics
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Bucket latency (detik): dari overlay beberapa ms sampai Gemini/Whisper beberapa detik
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _label_str(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0.0
+
+    def inc(self, n=1.0):
+        with self._lock:
+            self.value += n
+
+    def samples(self, name, labels):
+        return [(name, labels, self.value)]
+
+
+class Gauge:
+    kind = "gauge"
+
+    def __init__(self):
+        self.value = 0.0
+
+    def set(self, v):
+        self.value = float(v)
+
+    def samples(self, name, labels):
+        return [(name, labels, self.value)]
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)  # slot terakhir = +Inf
+        self._lock = threading.Lock()
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, v):
+        i = bisect.bisect_left(self.buckets, v)
+        with self._lock:
+            self._counts[i] += 1
+            self.count += 1
+            self.sum += v
+
+    @contextmanager
+    def time(self):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0)
+
+    def quantile(self, q):
+        """Estimasi kuantil dari bucket (interpolasi linear di dalam bucket)."""
+        with self._lock:
+            counts, total = list(self._counts), self.count
+        if total == 0:
+            return None
+        rank = q * total
+        seen, lower = 0, 0.0
+        for i, c in enumerate(counts):
+            upper = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+            if seen + c >= rank and c > 0:
+                return lower + (upper - lower) * (rank - seen) / c
+            seen += c
+            lower = upper
+        return self.buckets[-1]
+
+    def samples(self, name, labels):
+        with self._lock:
+            counts, total, s = list(self._counts), self.count, self.sum
+        out, cum = [], 0
+        for b, c in zip(self.buckets, counts):
+            cum += c
+            out.append((name + "_bucket", labels + (("le", repr(b)),), cum))
+        out.append((name + "_bucket", labels + (("le", "+Inf"),), total))
+        out.append((name + "_sum", labels, s))
+        out.append((name + "_count", labels, total))
+        return out
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}  # (name, labels) -> metric
+        self._help = {}
+
+    def _get(self, cls, name, help, labels, **kw):
+        key = (name, tuple(sorted(labels.items())))
+        m = self._metrics.get(key)
+        if m is None:
+            with self._lock:
+                m = self._metrics.get(key)
+                if m is None:
+                    m = self._metrics[key] = cls(**kw)
+                    if help:
+                        self._help[name] = help
+        return m
+
+    def counter(self, name, help="", **labels) -> Counter:
+        return self._get(Counter, name, help, labels)
+
+    def gauge(self, name, help="", **labels) -> Gauge:
+        return self._get(Gauge, name, help, labels)
+
+    def histogram(self, name, help="", buckets=DEFAULT_BUCKETS, **labels) -> Histogram:
+        return self._get(Histogram, name, help, labels, buckets=buckets)
+
+    def snapshot(self) -> list:
+        """Ringkasan untuk UI: satu dict per metrik."""
+        with self._lock:
+            items = sorted(self._metrics.items(), key=lambda kv: kv[0])
+        rows = []
+        for (name, labels), m in items:
+            row = {"metric": name + _label_str(labels), "type": m.kind}
+            if isinstance(m, Histogram):
+                p50, p95 = m.quantile(0.5), m.quantile(0.95)
+                row.update(
+                    count=m.count,
+                    mean_ms=(m.sum / m.count * 1000.0) if m.count else None,
+                    p50_ms=p50 * 1000.0 if p50 is not None else None,
+                    p95_ms=p95 * 1000.0 if p95 is not None else None,
+                )
+            else:
+                row.update(value=m.value)
+            rows.append(row)
+        return rows
+
+    def render_prometheus(self) -> str:
+        with self._lock:
+            items = sorted(self._metrics.items(), key=lambda kv: kv[0])
+            helps = dict(self._help)
+        lines, typed = [], set()
+        for (name, labels), m in items:
+            if name not in typed:
+                typed.add(name)
+                if name in helps:
+                    lines.append(f"# HELP {name} {helps[name]}")
+                lines.append(f"# TYPE {name} {m.kind}")
+            for sname, slabels, value in m.samples(name, labels):
+                lines.append(f"{sname}{_label_str(slabels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def counter(name, help="", **labels) -> Counter:
+    return REGISTRY.counter(name, help, **labels)
+
+
+def gauge(name, help="", **labels) -> Gauge:
+    return REGISTRY.gauge(name, help, **labels)
+
+
+def histogram(name, help="", **labels) -> Histogram:
+    return REGISTRY.histogram(name, help, **labels)
+
+
+def timed(name, help="", **labels):
+    """Context manager: catat durasi blok ke histogram ``name``."""
+    return REGISTRY.histogram(name, help, **labels).time()
+
+
+# ===== HTTP endpoint =====
+_server = None
+_server_lock = threading.Lock()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = REGISTRY.render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_metrics_server(port=9108, host="127.0.0.1"):
+    """Jalankan endpoint /metrics sekali per proses (aman dipanggil berulang)."""
+    global _server
+    with _server_lock:
+        if _server is not None:
+            return _server
+        try:
+            _server = ThreadingHTTPServer((host, port), _Handler)
+        except OSError as e:
+            print(f"[Metrics] gagal bind {host}:{port}: {e}")
+            return None
+        threading.Thread(target=_server.serve_forever, daemon=True).start()
+        print(f"[Metrics] Prometheus endpoint: http://{host}:{port}/metrics")
+        return _server
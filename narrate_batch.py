@@ -0,0 +1,296 @@
+# narrate_batch.py — narasi offline untuk file video / folder gambar (tanpa Streamlit/WebRTC)
+#
+# YOLO dijalankan per batch frame, OCR disebar ke process pool, hasil ditulis bertahap ke JSONL
+# (+ WAV per kalimat). Secepat mungkin, tanpa pacing real-time.
+#
+# Contoh:
+#   python narrate_batch.py --source walkthrough.mp4 --out walkthrough.jsonl --wav-dir walkthrough_wav/
+#   python narrate_batch.py --source signage/ --out signage.jsonl --ocr-workers 4 --batch 16
+import argparse
+import json
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from ocr_regions import OcrCache, clean_ocr, phash, select_ocr_regions
+
+IMAGE_EXTS = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
+
+
+def iter_items(source, sample_fps=2.0, max_frames=0):
+    """Yield dict(index, source, time_s, frame). Video diambil ``sample_fps`` frame per detik."""
+    source = Path(source)
+    n = 0
+    if source.is_dir():
+        for p in sorted(p for p in source.iterdir() if p.suffix.lower() in IMAGE_EXTS):
+            img = cv2.imread(str(p))
+            if img is None:
+                continue
+            yield {"index": n, "source": p.name, "time_s": None, "frame": img}
+            n += 1
+            if max_frames and n >= max_frames:
+                return
+        return
+    cap = cv2.VideoCapture(str(source))
+    if not cap.isOpened():
+        raise SystemExit(f"Tidak bisa membuka {source}")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    stride = max(1, int(round(fps / sample_fps))) if sample_fps > 0 else 1
+    pos = 0
+    try:
+        while True:
+            # grab() tanpa decode untuk frame yang dilewati
+            if not cap.grab():
+                return
+            if pos % stride == 0:
+                ok, img = cap.retrieve()
+                if ok:
+                    yield {"index": n, "source": source.name, "time_s": round(pos / fps, 3), "frame": img}
+                    n += 1
+                    if max_frames and n >= max_frames:
+                        return
+            pos += 1
+    finally:
+        cap.release()
+
+
+def batched(items, n):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= n:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# ===== OCR process pool (satu engine per proses) =====
+_engine = None
+
+
+def _ocr_init(langs, engine):
+    global _engine
+    # Tiap proses 1 thread, paralelisme dari jumlah proses
+    cv2.setNumThreads(1)
+    from ocr_engines import load_ocr_engine
+    _engine = load_ocr_engine(engine=engine, langs=langs, threads=1)
+
+
+def _ocr_crops(crops):
+    """Semua crop satu frame dalam satu panggilan recognize."""
+    return [clean_ocr(texts) for texts in _engine.recognize(crops)]
+
+
+def detect_batch(model, frames, imgsz, conf, batched_predict):
+    """List Detection per frame. Model export (ONNX/OpenVINO) punya batch statis 1."""
+    from tracking import detections_from_results
+
+    if batched_predict:
+        results = model.predict(frames, imgsz=imgsz, conf=conf, verbose=False)
+    else:
+        results = [model.predict(f, imgsz=imgsz, conf=conf, verbose=False)[0] for f in frames]
+    return [detections_from_results([r]) for r in results]
+
+
+class _TtsWriter:
+    """Thread latar: sintesis kalimat -> WAV, kalimat yang sama hanya disintesis sekali."""
+
+    def __init__(self, wav_dir):
+        from tts_cache import AudioCache
+
+        self.wav_dir = Path(wav_dir)
+        self.wav_dir.mkdir(parents=True, exist_ok=True)
+        self.cache = AudioCache(max_bytes=256 * 1024 * 1024)
+        self._q = queue.Queue()
+        self.written = 0
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, sentence, name) -> str:
+        path = self.wav_dir / name
+        self._q.put((sentence, path))
+        return str(path)
+
+    def _run(self):
+        from tts_model import synthesize_speech
+
+        while True:
+            item = self._q.get()
+            if item is None:
+                return
+            sentence, path = item
+            try:
+                buf = self.cache.get(sentence)
+                if buf is None:
+                    buf = synthesize_speech(sentence)
+                    self.cache.put(sentence, buf)
+                path.write_bytes(buf.getvalue())
+                self.written += 1
+            except Exception as e:
+                print(f"[Batch] TTS gagal untuk '{sentence}': {e}")
+
+    def close(self):
+        self._q.put(None)
+        self._thread.join()
+
+
+def run(args):
+    from detector_backend import detector_config, load_detector
+    from narration import NarrationState, build_sentence
+
+    det_cfg = detector_config(imgsz=args.imgsz)
+    model = load_detector(args.weights, **det_cfg)
+    names = model.names
+    batched_predict = det_cfg["backend"] == "torch"
+
+    is_folder = Path(args.source).is_dir()
+    mode = args.narration or ("full" if is_folder else "delta")
+    narration = NarrationState()
+    ocr_cache = OcrCache(max_items=4096, ttl=float("inf"))
+    pool = ProcessPoolExecutor(
+        max_workers=args.ocr_workers,
+        mp_context=mp.get_context("spawn"),
+        initializer=_ocr_init,
+        initargs=(tuple(args.ocr_langs.split(",")), args.ocr_engine),
+    ) if args.ocr_workers > 0 else None
+    tts = _TtsWriter(args.wav_dir) if args.wav_dir else None
+
+    out = open(args.out, "w", encoding="utf-8")
+    pending = deque()  # (item, labels, [list teks | (hashes, future)]) berurutan sesuai frame
+    stats = {"frames": 0, "records": 0, "ocr_crops": 0, "ocr_cached": 0}
+
+    def emit(item, labels, parts):
+        texts = []
+        for part in parts:
+            if isinstance(part, tuple):
+                keys, fut = part
+                try:
+                    results = fut.result()
+                except Exception as e:
+                    print(f"[Batch] OCR gagal: {e}")
+                    results = [[] for _ in keys]
+                for key, found in zip(keys, results):
+                    ocr_cache.put(key, found)
+                found = [t for r in results for t in r]
+            else:
+                found = part
+            for t in found:
+                if t not in texts:
+                    texts.append(t)
+        if mode == "full":
+            sentence = build_sentence(labels, texts)
+        else:
+            delta = narration.update(labels=labels, texts=texts)
+            sentence = ", ".join(delta)
+            sentence = (sentence[0].upper() + sentence[1:]) if sentence else None
+        if not sentence and not args.all_frames:
+            return
+        record = {
+            "index": item["index"],
+            "source": item["source"],
+            "time_s": item["time_s"],
+            "labels": labels,
+            "texts": texts,
+            "sentence": sentence,
+        }
+        if tts is not None and sentence:
+            record["wav"] = tts.submit(sentence, f"{item['index']:06d}.wav")
+        out.write(json.dumps(record, ensure_ascii=False) + "\n")
+        stats["records"] += 1
+
+    def drain(block):
+        # JSONL ditulis berurutan: berhenti di frame pertama yang OCR-nya belum selesai
+        while pending:
+            item, labels, parts = pending[0]
+            if not block and any(isinstance(p, tuple) and not p[1].done() for p in parts):
+                return
+            pending.popleft()
+            emit(item, labels, parts)
+
+    t_start = time.perf_counter()
+    try:
+        for batch in batched(iter_items(args.source, args.sample_fps, args.max_frames), args.batch):
+            frames = [it["frame"] for it in batch]
+            for item, dets in zip(batch, detect_batch(model, frames, det_cfg["imgsz"], args.conf, batched_predict)):
+                labels = [names[d.cls] for d in dets]
+                parts = []
+                if pool is not None:
+                    gray = cv2.cvtColor(item["frame"], cv2.COLOR_BGR2GRAY)
+                    keys, crops = [], []
+                    for x1, y1, x2, y2 in select_ocr_regions(gray, dets, names):
+                        crop = np.ascontiguousarray(gray[y1:y2, x1:x2])
+                        key = phash(crop)
+                        found = ocr_cache.get(key)
+                        if found is not None:
+                            stats["ocr_cached"] += 1
+                            parts.append(found)
+                        else:
+                            keys.append(key)
+                            crops.append(crop)
+                    if crops:
+                        stats["ocr_crops"] += len(crops)
+                        parts.append((keys, pool.submit(_ocr_crops, crops)))
+                item["frame"] = None  # frame tidak dibutuhkan lagi
+                pending.append((item, labels, parts))
+            stats["frames"] += len(batch)
+            drain(block=len(pending) > args.max_pending)
+            out.flush()
+            if stats["frames"] % (args.batch * 20) < args.batch:
+                el = time.perf_counter() - t_start
+                print(f"[Batch] {stats['frames']} frame, {stats['frames'] / el:.1f} frame/s, "
+                      f"{stats['records']} kalimat")
+        drain(block=True)
+    finally:
+        out.close()
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+        if tts is not None:
+            tts.close()
+
+    elapsed = time.perf_counter() - t_start
+    stats.update(
+        elapsed_s=round(elapsed, 2),
+        frames_per_s=round(stats["frames"] / elapsed, 2) if elapsed else 0.0,
+        wav_written=tts.written if tts is not None else 0,
+        narration=mode,
+    )
+    return stats
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Narasi batch untuk video / folder gambar -> JSONL (+ WAV)")
+    ap.add_argument("--source", required=True, help="file video atau folder gambar")
+    ap.add_argument("--out", required=True, help="file JSONL output")
+    ap.add_argument("--wav-dir", default=None, help="folder WAV per kalimat (opsional)")
+    ap.add_argument("--weights", default=str(Path(__file__).parent / "yolo12n.pt"))
+    ap.add_argument("--imgsz", type=int, default=None)
+    ap.add_argument("--conf", type=float, default=0.5)
+    ap.add_argument("--batch", type=int, default=16, help="frame per model.predict")
+    ap.add_argument("--sample-fps", type=float, default=2.0, help="frame video per detik; 0 = semua frame")
+    ap.add_argument("--max-frames", type=int, default=0)
+    ap.add_argument("--ocr-workers", type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                    help="jumlah proses OCR; 0 = tanpa OCR")
+    ap.add_argument("--ocr-langs", default="id,en")
+    ap.add_argument("--ocr-engine", choices=["easyocr", "paddle"], default=None,
+                    help="default: VISORA_OCR_ENGINE")
+    ap.add_argument("--max-pending", type=int, default=256, help="frame menunggu OCR sebelum deteksi ditahan")
+    ap.add_argument("--narration", choices=["full", "delta"], default=None,
+                    help="default: delta untuk video, full untuk folder gambar")
+    ap.add_argument("--all-frames", action="store_true", help="tulis juga frame tanpa kalimat")
+    args = ap.parse_args(argv)
+
+    stats = run(args)
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == "__main__":
+    main()
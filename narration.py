@@ -0,0 +1,125 @@
+# narration.py — state narasi: hanya perubahan scene yang diucapkan ("ada orang baru", "buku hilang")
+import time
+from collections import Counter, OrderedDict
+
+_ANGKA = ("nol", "satu", "dua", "tiga", "empat", "lima", "enam", "tujuh", "delapan", "sembilan")
+
+
+def count_word(n: int) -> str:
+    """Jumlah sebagai kata ("dua", "sebelas", "dua puluh satu"); SpeechT5 tidak punya digit di vokabnya."""
+    if n < 10:
+        return _ANGKA[n]
+    if n == 10:
+        return "sepuluh"
+    if n == 11:
+        return "sebelas"
+    if n < 20:
+        return f"{_ANGKA[n - 10]} belas"
+    if n < 100:
+        tens, unit = divmod(n, 10)
+        return f"{_ANGKA[tens]} puluh" + (f" {_ANGKA[unit]}" if unit else "")
+    return "banyak"
+
+
+def build_sentence(labels, ocr_texts):
+    """Kalimat narasi lengkap ("Saya melihat objek ..., teks ..."); mode "full" dan narrate_batch."""
+    parts = []
+
+    if labels:
+        parts.append("objek " + ", ".join(sorted(set(labels))))
+
+    if ocr_texts:
+        parts.append("teks " + ", ".join(ocr_texts))
+
+    if labels or ocr_texts:
+        return "Saya melihat " + ", ".join(parts)
+    return None
+
+
+class _Entry:
+    __slots__ = ("seen", "missed", "present", "first_seen", "last_seen")
+
+    def __init__(self, now):
+        self.seen = 0
+        self.missed = 0
+        self.present = False
+        self.first_seen = now
+        self.last_seen = now
+
+
+class NarrationState:
+    """Lacak objek (per label, dengan jumlah) dan teks yang sedang terlihat.
+
+    Hysteresis: sesuatu dianggap *muncul* setelah terlihat ``appear_after`` pass berturut-turut
+    dan *hilang* setelah tidak terlihat ``vanish_after`` pass, jadi deteksi yang berkedip tidak
+    menghasilkan ucapan. Jumlah entry dibatasi ``max_entries`` (yang paling lama tidak terlihat dibuang).
+    """
+
+    def __init__(self, appear_after=2, vanish_after=4, max_entries=128, max_texts=3, text_appear_after=1):
+        self.appear_after = appear_after
+        self.text_appear_after = text_appear_after
+        self.vanish_after = vanish_after
+        self.max_entries = max_entries
+        self.max_texts = max_texts
+        self._objects = OrderedDict()  # (label, n) -> _Entry ; n = objek ke-n dengan label itu
+        self._texts = OrderedDict()    # teks -> _Entry
+
+    def _step(self, table, keys, now, appear_after):
+        appeared, vanished = [], []
+        for k in keys:
+            e = table.get(k)
+            if e is None:
+                e = table[k] = _Entry(now)
+            e.seen += 1
+            e.missed = 0
+            e.last_seen = now
+            table.move_to_end(k)
+            if not e.present and e.seen >= appear_after:
+                e.present = True
+                appeared.append(k)
+        for k, e in list(table.items()):
+            if k in keys:
+                continue
+            e.seen = 0
+            e.missed += 1
+            if e.present and e.missed >= self.vanish_after:
+                e.present = False
+                vanished.append(k)
+            if not e.present and e.missed >= self.vanish_after:
+                del table[k]
+        while len(table) > self.max_entries:
+            table.popitem(last=False)
+        return appeared, vanished
+
+    def update(self, labels=None, texts=None, now=None):
+        """Satu pass deteksi (``labels``) dan/atau OCR (``texts``); None = stage itu tidak berjalan.
+
+        Return list potongan kalimat delta (kosong kalau tidak ada perubahan).
+        """
+        now = now if now is not None else time.time()
+        parts = []
+        if labels is not None:
+            counts = Counter(labels)
+            keys = {(label, i) for label, n in counts.items() for i in range(1, n + 1)}
+            appeared, vanished = self._step(self._objects, keys, now, self.appear_after)
+            new = Counter(label for label, _ in appeared)
+            gone = Counter(label for label, _ in vanished)
+            for label, n in sorted(new.items()):
+                parts.append(f"ada {label} baru" if n == 1 else f"ada {count_word(n)} {label} baru")
+            for label, n in sorted(gone.items()):
+                parts.append(f"{label} hilang" if n == 1 else f"{count_word(n)} {label} hilang")
+
+        if texts is not None:
+            t_keys = set(texts[: self.max_texts])
+            t_new, _ = self._step(self._texts, t_keys, now, self.text_appear_after)
+            if t_new:
+                parts.append("teks " + ", ".join(sorted(t_new)))
+        return parts
+
+    def present(self):
+        """Label yang sedang dianggap terlihat (untuk ringkasan penuh)."""
+        return sorted({label for (label, _), e in self._objects.items() if e.present})
+
+    def reset(self):
+        self._objects.clear()
+        self._texts.clear()
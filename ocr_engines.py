@@ -0,0 +1,160 @@
+# ocr_engines.py — backend OCR yang bisa dipilih (EasyOCR / PaddleOCR) lewat konfigurasi
+#
+# Semua backend menerima beberapa crop sekaligus: recognize(crops) -> satu list teks per crop.
+#   VISORA_OCR_ENGINE=paddle VISORA_OCR_THREADS=2
+import os
+from abc import ABC, abstractmethod
+
+import cv2
+import numpy as np
+
+ENGINES = ("easyocr", "paddle")
+
+
+def ocr_config(**overrides) -> dict:
+    """Konfigurasi OCR dari env (VISORA_OCR_*), bisa ditimpa lewat argumen."""
+    cfg = {
+        "engine": os.getenv("VISORA_OCR_ENGINE", "easyocr").lower(),
+        "langs": tuple(os.getenv("VISORA_OCR_LANGS", "id,en").split(",")),
+        "threads": int(os.getenv("VISORA_OCR_THREADS", "0")) or None,
+        # PaddleOCR: bahasa model recognizer dan high-performance inference (ONNX Runtime via PaddleX)
+        "paddle_lang": os.getenv("VISORA_OCR_PADDLE_LANG", "en"),
+        "paddle_hpi": os.getenv("VISORA_OCR_PADDLE_HPI", "0").lower() in ("1", "true", "yes", "on"),
+    }
+    cfg.update({k: v for k, v in overrides.items() if v is not None})
+    if cfg["engine"] not in ENGINES:
+        raise ValueError(f"engine OCR tidak dikenal: {cfg['engine']} (pilih {', '.join(ENGINES)})")
+    return cfg
+
+
+def prepare_crop(crop):
+    """Crop kecil diperbesar 2x; teks di bawah ~32 px sering tidak terbaca."""
+    if crop.shape[0] < 32:
+        crop = cv2.resize(crop, None, fx=2, fy=2, interpolation=cv2.INTER_CUBIC)
+    return crop
+
+
+def _pow2(n, lo=64):
+    p = lo
+    while p < n:
+        p *= 2
+    return p
+
+
+def size_buckets(crops, heights=(64, 128, 256), max_width=2048):
+    """Kelompokkan crop gray per ukuran target untuk ``readtext_batched``: {(h, w): [indeks, ...]}.
+
+    Tinggi dinaikkan ke bucket terdekat (rasio tetap), lebar dibulatkan ke pangkat dua (pad <= 2x),
+    jadi baris teks pendek tidak ikut diskalakan ke tinggi crop terbesar di frame. Crop lebih tinggi
+    dari ``heights[-1]`` masuk bucket ``None`` (dibaca satu per satu, tanpa resize).
+    """
+    buckets = {}
+    for i, c in enumerate(crops):
+        h, w = c.shape[:2]
+        th = next((b for b in heights if h <= b), None)
+        if th is None:
+            buckets.setdefault(None, []).append(i)
+            continue
+        nw = min(max_width, round(w * th / h))
+        buckets.setdefault((th, _pow2(nw)), []).append(i)
+    return buckets
+
+
+def fit_crop(crop, size):
+    """Skala crop gray ke dalam ``size`` (h, w) tanpa distorsi, sisanya di-pad dengan warna latar."""
+    th, tw = size
+    h, w = crop.shape[:2]
+    scale = min(th / h, tw / w)
+    nh, nw = max(1, round(h * scale)), max(1, round(w * scale))
+    if (nh, nw) != (h, w):
+        crop = cv2.resize(crop, (nw, nh), interpolation=cv2.INTER_CUBIC if scale > 1 else cv2.INTER_AREA)
+    return cv2.copyMakeBorder(crop, 0, th - nh, 0, tw - nw, cv2.BORDER_CONSTANT, value=float(np.median(crop)))
+
+
+class OcrEngine(ABC):
+    name = "base"
+
+    @abstractmethod
+    def recognize(self, crops) -> list:
+        """List crop (gray atau BGR) -> list ``[teks, ...]`` per crop, urutan sama."""
+
+
+class EasyOcrEngine(OcrEngine):
+    name = "easyocr"
+
+    def __init__(self, langs=("id", "en"), threads=None, **_):
+        if threads:
+            import torch
+            torch.set_num_threads(threads)
+        import easyocr
+
+        self.reader = easyocr.Reader(list(langs), gpu=False)
+
+    def recognize(self, crops):
+        if not crops:
+            return []
+        crops = [prepare_crop(c) for c in crops]
+        crops = [c if c.ndim == 2 else cv2.cvtColor(c, cv2.COLOR_BGR2GRAY) for c in crops]
+        out = [None] * len(crops)
+        # readtext_batched butuh ukuran sama: satu panggilan per bucket ukuran (lihat size_buckets)
+        for size, idx in size_buckets(crops).items():
+            if size is None or len(idx) == 1:
+                for i in idx:
+                    out[i] = self.reader.readtext(crops[i], detail=0, paragraph=True)
+                continue
+            th, tw = size
+            res = self.reader.readtext_batched([fit_crop(crops[i], size) for i in idx],
+                                               n_width=tw, n_height=th, detail=0, paragraph=True)
+            for i, texts in zip(idx, res):
+                out[i] = list(texts)
+        return out
+
+
+class PaddleOcrEngine(OcrEngine):
+    """PP-OCRv5 mobile (deteksi + recognizer) tanpa klasifikasi orientasi/unwarping dokumen."""
+
+    name = "paddle"
+
+    def __init__(self, paddle_lang="en", threads=None, paddle_hpi=False, **_):
+        from paddleocr import PaddleOCR
+
+        kwargs = dict(
+            lang=paddle_lang,
+            text_detection_model_name="PP-OCRv5_mobile_det",
+            use_doc_orientation_classify=False,
+            use_doc_unwarping=False,
+            use_textline_orientation=False,
+            enable_hpi=paddle_hpi,
+        )
+        if threads:
+            kwargs["cpu_threads"] = threads
+        self.ocr = PaddleOCR(**kwargs)
+
+    def recognize(self, crops):
+        if not crops:
+            return []
+        imgs = []
+        for c in crops:
+            c = prepare_crop(c)
+            imgs.append(cv2.cvtColor(c, cv2.COLOR_GRAY2BGR) if c.ndim == 2 else c)
+        out = []
+        for res in self.ocr.predict(imgs):
+            # Satu string per crop, setara paragraph=True EasyOCR
+            texts = [t for t in res["rec_texts"] if t.strip()]
+            out.append([" ".join(texts)] if texts else [])
+        return out
+
+
+def load_ocr_engine(**overrides) -> OcrEngine:
+    """Engine sesuai ``ocr_config``. Kalau PaddleOCR gagal dimuat, jatuh kembali ke EasyOCR."""
+    cfg = ocr_config(**overrides)
+    if cfg["engine"] == "paddle":
+        try:
+            engine = PaddleOcrEngine(**cfg)
+            print(f"[OCR] PaddleOCR siap (lang={cfg['paddle_lang']}, hpi={cfg['paddle_hpi']})")
+            return engine
+        except Exception as e:
+            print(f"[OCR] PaddleOCR gagal dimuat ({e}), pakai EasyOCR")
+    engine = EasyOcrEngine(**cfg)
+    print(f"[OCR] EasyOCR siap (langs={','.join(cfg['langs'])})")
+    return engine
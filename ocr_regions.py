@@ -0,0 +1,130 @@
+# ocr_regions.py — pilih crop yang kemungkinan berisi teks + cache hasil OCR per perceptual hash
+import threading
+import time
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+# Kelas COCO yang biasanya membawa teks (label, layar, sampul, rambu)
+TEXT_CLASSES = {
+    "book", "bottle", "cell phone", "laptop", "tv", "tvmonitor", "stop sign", "clock",
+    "keyboard", "remote", "cup", "parking meter", "bus", "truck", "suitcase", "refrigerator",
+}
+
+
+def clean_ocr(results_ocr):
+    """Buang potongan OCR yang terlalu pendek (noise)."""
+    return [t.strip() for t in results_ocr if len(t.strip()) > 2]
+
+
+def _clip_box(box, w, h, pad=0.05):
+    x1, y1, x2, y2 = [float(v) for v in box]
+    px, py = (x2 - x1) * pad, (y2 - y1) * pad
+    x1, y1 = max(0, int(x1 - px)), max(0, int(y1 - py))
+    x2, y2 = min(w, int(x2 + px)), min(h, int(y2 + py))
+    return x1, y1, x2, y2
+
+
+def find_text_regions(gray, max_regions=3, min_area=600):
+    """Prefilter murah: gradient morfologi + closing horizontal -> blok mirip baris teks."""
+    h, w = gray.shape[:2]
+    scale = 320.0 / max(w, 1) if w > 320 else 1.0
+    small = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA) if scale != 1.0 else gray
+    grad = cv2.morphologyEx(small, cv2.MORPH_GRADIENT, cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3)))
+    _, bw = cv2.threshold(grad, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+    bw = cv2.morphologyEx(bw, cv2.MORPH_CLOSE, cv2.getStructuringElement(cv2.MORPH_RECT, (9, 1)))
+    contours, _ = cv2.findContours(bw, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    regions = []
+    inv = 1.0 / scale
+    for c in contours:
+        x, y, cw, ch = cv2.boundingRect(c)
+        if ch < 6 or cw < 2 * ch:
+            continue
+        # Baris teks: cukup padat di dalam kotaknya
+        fill = cv2.countNonZero(bw[y:y + ch, x:x + cw]) / float(cw * ch)
+        if fill < 0.45:
+            continue
+        box = (x * inv, y * inv, (x + cw) * inv, (y + ch) * inv)
+        area = (box[2] - box[0]) * (box[3] - box[1])
+        if area >= min_area:
+            regions.append((area, box))
+    regions.sort(key=lambda r: -r[0])
+    return [_clip_box(b, w, h, pad=0.15) for _, b in regions[:max_regions]]
+
+
+def select_ocr_regions(gray, detections, names, max_regions=3):
+    """Box objek pembawa teks; kalau tidak ada, pakai hasil prefilter."""
+    h, w = gray.shape[:2]
+    boxes = [
+        _clip_box(d.box, w, h)
+        for d in sorted(detections, key=lambda d: -d.score)
+        if names[d.cls] in TEXT_CLASSES
+    ]
+    if not boxes:
+        boxes = find_text_regions(gray, max_regions=max_regions)
+    return [b for b in boxes[:max_regions] if (b[2] - b[0]) >= 16 and (b[3] - b[1]) >= 8]
+
+
+def phash(gray) -> int:
+    """Perceptual hash 64-bit berbasis DCT (tahan terhadap noise/skala kecil)."""
+    small = cv2.resize(gray, (32, 32), interpolation=cv2.INTER_AREA).astype(np.float32)
+    low = cv2.dct(small)[:8, :8].flatten()[1:]  # buang komponen DC
+    bits = low > np.median(low)
+    return int("".join("1" if b else "0" for b in bits), 2)
+
+
+class OcrCache:
+    """Cache hasil OCR per crop. Lookup pakai jarak Hamming, jadi crop yang sedikit
+    bergeser/berubah cahaya tetap hit. Dibatasi jumlah entry (entry tertua dibuang) dan TTL."""
+
+    def __init__(self, max_items=256, ttl=30.0, max_distance=4):
+        self.max_items = max_items
+        self.ttl = ttl
+        self.max_distance = max_distance
+        self._items = OrderedDict()  # hash -> (timestamp, texts)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _expire(self, now):
+        while self._items:
+            k, (ts, _) = next(iter(self._items.items()))
+            if now - ts <= self.ttl:
+                break
+            self._items.popitem(last=False)
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            hit = key if key in self._items else None
+            if hit is None and self.max_distance > 0:
+                for k in self._items:
+                    if bin(k ^ key).count("1") <= self.max_distance:
+                        hit = k
+                        break
+            if hit is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return list(self._items[hit][1])
+
+    def put(self, key, texts):
+        with self._lock:
+            # TTL dihitung dari waktu OCR terakhir, jadi entry baru ditaruh di belakang
+            self._items.pop(key, None)
+            self._items[key] = (time.time(), list(texts))
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._items),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / total) if total else 0.0,
+            }
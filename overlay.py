@@ -0,0 +1,127 @@
+# overlay.py — hasil deteksi terstruktur + gambar overlay di frame kamera terbaru (dengan ekstrapolasi box)
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from tracking import iou
+
+
+class OverlayItem:
+    __slots__ = ("box", "cls", "score", "id", "vel")
+
+    def __init__(self, box, cls, score, id=None, vel=None):
+        self.box = box
+        self.cls = cls
+        self.score = score
+        self.id = id
+        self.vel = vel if vel is not None else np.zeros(2, dtype=np.float32)  # px/detik (pusat box)
+
+
+class OverlayState:
+    """Simpan deteksi terakhir (box, kelas, skor, ID, kecepatan) + teks OCR.
+
+    ``snapshot()`` menggeser box sesuai kecepatan sejak timestamp frame asalnya,
+    maksimal ``max_extrapolate`` detik supaya box tidak "terbang" kalau detektor macet.
+    """
+
+    def __init__(self, max_extrapolate=0.5, smoothing=0.5, text_max_age=3.0):
+        self.max_extrapolate = max_extrapolate
+        self.smoothing = smoothing
+        self.text_max_age = text_max_age
+        self._lock = threading.Lock()
+        self._items = []
+        self._ts = 0.0
+        self._texts = []
+        self._texts_ts = 0.0
+
+    def _match(self, det, prev):
+        if det.id is not None:
+            for p in prev:
+                if p.id == det.id:
+                    return p
+            return None
+        best, best_iou = None, 0.3
+        for p in prev:
+            if p.cls == det.cls:
+                v = iou(p.box, det.box)
+                if v >= best_iou:
+                    best, best_iou = p, v
+        return best
+
+    def update(self, detections, ts=None):
+        ts = ts if ts is not None else time.time()
+        with self._lock:
+            prev, prev_ts = self._items, self._ts
+        dt = ts - prev_ts
+        items = []
+        for det in detections:
+            box = np.asarray(det.box, dtype=np.float32)
+            vel = None
+            p = self._match(det, prev)
+            if p is not None and 0 < dt < 1.0:
+                c_new = (box[:2] + box[2:]) / 2.0
+                c_old = (p.box[:2] + p.box[2:]) / 2.0
+                v = (c_new - c_old) / dt
+                vel = self.smoothing * p.vel + (1.0 - self.smoothing) * v
+            items.append(OverlayItem(box, det.cls, det.score, det.id, vel))
+        with self._lock:
+            self._items, self._ts = items, ts
+
+    def set_texts(self, texts, ts=None):
+        with self._lock:
+            self._texts = list(texts)
+            self._texts_ts = ts if ts is not None else time.time()
+
+    def snapshot(self, now=None):
+        """Return (list (box_xyxy_int, cls, score, id), texts) untuk waktu ``now``."""
+        now = now if now is not None else time.time()
+        with self._lock:
+            items, ts = self._items, self._ts
+            texts = self._texts if now - self._texts_ts <= self.text_max_age else []
+        dt = min(max(0.0, now - ts), self.max_extrapolate)
+        out = []
+        for it in items:
+            shift = it.vel * dt
+            box = it.box + np.array([shift[0], shift[1], shift[0], shift[1]], dtype=np.float32)
+            out.append((box.astype(int), it.cls, it.score, it.id))
+        return out, texts
+
+    def clear(self):
+        with self._lock:
+            self._items, self._texts = [], []
+
+
+def draw_overlay(img, items, texts, names, colors):
+    """Gambar box + label + teks OCR langsung (in-place) ke ``img``."""
+    for (x1, y1, x2, y2), cls, score, tid in items:
+        label = names[cls]
+        if tid is not None:
+            label = f"{label} #{tid}"
+
+        color = colors[cls % len(colors)]
+        cv2.rectangle(img, (x1, y1), (x2, y2), color, 2)
+        cv2.putText(
+            img,
+            f"{label} {score:.2f}",
+            (x1, y1 - 10),
+            cv2.FONT_HERSHEY_SIMPLEX,
+            0.6,
+            color,
+            2,
+        )
+
+    y = 30
+    for text in texts[:3]:
+        cv2.putText(
+            img,
+            text,
+            (10, y),
+            cv2.FONT_HERSHEY_SIMPLEX,
+            0.7,
+            (0, 255, 255),
+            2
+        )
+        y += 30
+    return img
@@ -0,0 +1,96 @@
+# pipeline.py — utilitas pipeline bertahap: slot latest-wins dan timer per stage
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+
+from metrics import counter, histogram
+
+
+class LatestSlot:
+    """Antrian satu slot: item baru menimpa yang belum diambil (dihitung sebagai dropped)."""
+
+    def __init__(self, name=None):
+        self._item = None
+        self._has = False
+        self._cv = threading.Condition()
+        self.put_count = 0
+        self.dropped = 0
+        self._m_dropped = counter("visora_slot_dropped_total", "Item ditimpa sebelum diambil", slot=name) if name else None
+
+    def put(self, item):
+        with self._cv:
+            if self._has:
+                self.dropped += 1
+                if self._m_dropped is not None:
+                    self._m_dropped.inc()
+            self._item, self._has = item, True
+            self.put_count += 1
+            self._cv.notify()
+
+    def get(self, timeout=None):
+        """Return item terbaru, atau None kalau timeout."""
+        with self._cv:
+            if not self._has:
+                self._cv.wait(timeout=timeout)
+            if not self._has:
+                return None
+            item, self._item, self._has = self._item, None, False
+            return item
+
+    def depth(self) -> int:
+        with self._cv:
+            return 1 if self._has else 0
+
+    def clear(self):
+        with self._cv:
+            self._item, self._has = None, False
+
+
+class StageTimer:
+    """Simpan durasi N sampel terakhir satu stage, untuk mean/p50/p95.
+
+    Kalau ``metric`` diisi, tiap sampel juga masuk histogram ``visora_stage_seconds{stage=...}``.
+    """
+
+    def __init__(self, window=256, metric=None):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.last = None
+        self._hist = histogram("visora_stage_seconds", "Durasi per stage pipeline video", stage=metric) if metric else None
+
+    def record(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+            self.count += 1
+            self.last = seconds
+        if self._hist is not None:
+            self._hist.observe(seconds)
+
+    @contextmanager
+    def time(self):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(time.perf_counter() - t0)
+
+    def samples_ms(self) -> list:
+        with self._lock:
+            return [v * 1000.0 for v in self._samples]
+
+    def stats(self) -> dict:
+        with self._lock:
+            if not self._samples:
+                return {"count": self.count}
+            arr = np.fromiter(self._samples, dtype=np.float64) * 1000.0
+        return {
+            "count": self.count,
+            "last_ms": self.last * 1000.0,
+            "mean_ms": float(arr.mean()),
+            "p50_ms": float(np.percentile(arr, 50)),
+            "p95_ms": float(np.percentile(arr, 95)),
+        }
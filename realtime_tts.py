@@ -1,5 +1,5 @@
 # realtime_tts.py — RTTS enterprise: no-overlap, instant fallback, direct SAPI5 speak
-import threading, time, platform, tempfile, os
+import threading, time, platform, tempfile, os, queue
 from io import BytesIO
 
 import numpy as np
@@ -7,36 +7,96 @@ import soundfile as sf
 import sounddevice as sd
 
 tts_busy = threading.Event()
+tts_ready = threading.Event()  # diset setelah health check worker (model TTS sudah termuat)
 
-# TTS utama (bisa error karena torch.load CVE)
-try:
-    from tts_model import synthesize_speech as synth_torch
-except Exception:
-    synth_torch = None
+# TTS utama (bisa error karena torch.load CVE). Import torch/transformers baru dilakukan
+# di thread worker lewat _load_tts_backend(), supaya import modul ini tidak memblok UI.
+synth_torch = None
+_backend_lock = threading.Lock()
+_backend_loaded = False
 
-# ========= Dropping queue (latest wins) =========
-class _DroppingQueue:
-    def __init__(self):
-        self._item = None
-        self._cv = threading.Condition()
+def _load_tts_backend():
+    global synth_torch, _backend_loaded
+    with _backend_lock:
+        if not _backend_loaded:
+            _backend_loaded = True
+            try:
+                from tts_model import synthesize_speech
+                synth_torch = synthesize_speech
+            except Exception as e:
+                print(f"[RTTS] Torch TTS tidak tersedia: {e}")
+    return synth_torch
+
+from text_clauses import split_clauses
+from tts_cache import AudioCache
+from audio_output import AudioOutput
+from fragments import FragmentBank, narration_phrases
+from metrics import counter, histogram
+from speech_scheduler import SpeechScheduler, PRIORITY_ALERT, PRIORITY_REPLY
+
+# Cache utterance: kalimat detektor sering berulang, jadi tidak perlu vocoder ulang
+_cache_mb = float(os.getenv("VISORA_TTS_CACHE_MB", "64"))
+tts_cache = AudioCache(
+    max_bytes=int(_cache_mb * 1024 * 1024),
+    cache_dir=os.getenv("VISORA_TTS_CACHE_DIR") or None,
+)
+
+_m_cache_hit = counter("visora_tts_cache_hits_total", "Utterance diambil dari cache audio")
+_m_cache_miss = counter("visora_tts_cache_misses_total", "Utterance yang harus disintesis")
+_m_play = histogram("visora_tts_play_seconds", "Durasi _play_wav_bytes_blocking")
+
+def _synth_cached(text: str) -> BytesIO:
+    buf = tts_cache.get(text)
+    if buf is not None:
+        _m_cache_hit.inc()
+        return buf
+    _m_cache_miss.inc()
+    wav = synth_torch(text)
+    tts_cache.put(text, wav)
+    wav.seek(0)
+    return wav
+
+# Fragmen kosakata narasi (nama kelas + kata template), disambung dengan crossfade
+fragment_bank = FragmentBank()
+_m_fragment = counter("visora_tts_fragment_total", "Narasi yang disusun dari fragmen siap pakai")
+
+def warm_fragments(class_names, path=None):
+    """Muat/sintesis fragmen untuk ``class_names`` di thread latar; simpan ke VISORA_FRAGMENTS."""
+    path = path or os.getenv("VISORA_FRAGMENTS", "tts_fragments.npz")
 
-    def put_nowait(self, item):
-        with self._cv:
-            self._item = item
-            self._cv.notify()
+    def run():
+        _load_tts_backend()
+        t0 = time.perf_counter()
+        try:
+            if os.path.exists(path):
+                fragment_bank.load(path)
+        except Exception as e:
+            print(f"[RTTS] Gagal memuat fragmen {path}: {e}")
+        added = fragment_bank.build(narration_phrases(class_names), synth_torch) if synth_torch else 0
+        if added:
+            try:
+                fragment_bank.save(path)
+            except Exception as e:
+                print(f"[RTTS] Gagal menyimpan fragmen {path}: {e}")
+        print(f"[RTTS] Fragmen siap: {len(fragment_bank)} ({added} baru, {time.perf_counter() - t0:.1f}s)")
+
+    threading.Thread(target=run, daemon=True).start()
 
-    def get(self, timeout=None):
-        with self._cv:
-            if self._item is None:
-                self._cv.wait(timeout=timeout)
-            item, self._item = self._item, None
-            return item
+# ========= Speech scheduler (prioritas + deadline + coalescing) =========
+# speak_q.put_nowait(text) tetap jalan: narasi scene, latest-wins, basi setelah VISORA_NARRATION_TTL
+speak_q = SpeechScheduler(
+    narration_ttl=float(os.getenv("VISORA_NARRATION_TTL", "3")),
+    alert_ttl=float(os.getenv("VISORA_ALERT_TTL", "2")),
+)
 
-    def flush(self):
-        with self._cv:
-            self._item = None
+def speak_reply(text: str):
+    """Antrikan satu kalimat jawaban; diputar berurutan dan didahulukan dari narasi detektor."""
+    if text and text.strip():
+        speak_q.put(text.strip(), PRIORITY_REPLY, coalesce=False)
 
-speak_q = _DroppingQueue()
+def speak_alert(text: str, key=None):
+    """Peringatan penting: memotong narasi/jawaban yang sedang diputar."""
+    speak_q.put(text, PRIORITY_ALERT, key=key)
 
 # ========= Audio helpers (untuk jalur torch saja) =========
 def _pick_output_device():
@@ -54,34 +114,119 @@ def _pick_output_device():
             return idx, name
     return (candidates[0] if candidates else (None, None))
 
-def _play_wav_bytes_blocking(buf: BytesIO, out_idx=None, pause_check=None):
-    """Play audio dengan kemampuan untuk di-interrupt oleh pause_check"""
+# Stream output yang hidup lama (dibuka worker, dipakai semua utterance)
+_output = None
+_output_lock = threading.Lock()
+
+def _get_output(out_idx=None) -> AudioOutput:
+    global _output
+    with _output_lock:
+        if _output is None:
+            _output = AudioOutput(
+                device=out_idx,
+                blocksize=int(os.getenv("VISORA_AUDIO_BLOCKSIZE", "512")),
+            )
+            print(f"[RTTS] Output stream: {_output.samplerate} Hz, blok {_output.blocksize} sampel")
+        return _output
+
+def _close_output():
+    global _output
+    with _output_lock:
+        if _output is not None:
+            _output.close()
+            _output = None
+
+def _enqueue_wav(buf: BytesIO, out_idx=None):
+    """Decode WAV lalu antrikan di stream output (resample ke rate device sekali di sini)."""
     buf.seek(0)
     data, sr = sf.read(buf, dtype="float32")
-    if data.ndim == 1:
-        data = data.reshape(-1, 1)
-    
-    # Only set OUTPUT device to avoid collision with webcam input
-    if out_idx is not None:
-        try:
-            cur = sd.default.device
-        except Exception:
-            cur = (None, None)
-        sd.default.device = (cur[0], out_idx)
-    
-    # Play dengan callback untuk check pause
-    if pause_check is not None:
-        # Non-blocking play dengan manual wait + pause check
-        sd.play(data, sr, device=out_idx, blocking=False)
-        while sd.get_stream().active:
-            if pause_check():
-                sd.stop()  # Stop audio immediately
-                print("[RTTS] Audio interrupted by pause")
+    return _get_output(out_idx).enqueue(data, sr)
+
+def _play_wav_bytes_blocking(buf: BytesIO, out_idx=None, pause_check=None):
+    """Play audio dengan kemampuan untuk di-interrupt oleh pause_check"""
+    with _m_play.time():
+        clip = _enqueue_wav(buf, out_idx)
+        if not _get_output(out_idx).wait(clip, pause_check):
+            print("[RTTS] Audio interrupted by pause")
+
+def _play_streaming_blocking(text: str, out_idx=None, pause_check=None):
+    """Sintesis klausa N+1 di thread terpisah sementara klausa N diputar.
+
+    Return False kalau playback di-interrupt oleh pause_check.
+    """
+    clauses = split_clauses(text)
+    if len(clauses) <= 1:
+        t0 = time.perf_counter()
+        wav = _synth_cached(text)
+        print(f"[RTTS] ttfa={1000 * (time.perf_counter() - t0):.0f}ms")
+        _play_wav_bytes_blocking(wav, out_idx=out_idx, pause_check=pause_check)
+        return not (pause_check and pause_check())
+
+    chunks = queue.Queue(maxsize=2)  # cukup 1 klausa di depan yang sedang diputar
+    cancel = threading.Event()
+    _END = object()
+
+    def _put(item):
+        while not cancel.is_set():
+            try:
+                chunks.put(item, timeout=0.1)
                 return
-            time.sleep(0.05)
-    else:
-        # Blocking biasa
-        sd.play(data, sr, device=out_idx, blocking=True)
+            except queue.Full:
+                continue
+
+    def producer():
+        try:
+            for clause in clauses:
+                if cancel.is_set():
+                    return
+                _put(_synth_cached(clause))
+        except Exception as e:
+            _put(e)
+        finally:
+            _put(_END)
+
+    t0 = time.perf_counter()
+    threading.Thread(target=producer, daemon=True).start()
+    out = _get_output(out_idx)
+    first = True
+    prev = None
+    try:
+        with _m_play.time():
+            while True:
+                # Selama klausa berikutnya masih disintesis, interrupt tetap dicek tiap satu blok audio
+                try:
+                    item = chunks.get(timeout=out.block_seconds)
+                except queue.Empty:
+                    if pause_check and pause_check():
+                        out.stop()
+                        return False
+                    continue
+                if item is _END:
+                    return prev is None or out.wait(prev, pause_check)
+                if isinstance(item, Exception):
+                    raise item
+                if first:
+                    print(f"[RTTS] ttfa={1000 * (time.perf_counter() - t0):.0f}ms ({len(clauses)} klausa)")
+                    first = False
+                if pause_check and pause_check():
+                    out.stop()
+                    return False
+                # Klausa baru langsung disambung di belakang yang sedang diputar (tanpa jeda);
+                # lalu tunggu klausa sebelumnya habis supaya sintesis tidak lari terlalu jauh.
+                clip = _enqueue_wav(item, out_idx)
+                if prev is not None and not out.wait(prev, pause_check):
+                    return False
+                prev = clip
+    finally:
+        cancel.set()
+
+def tts_audio_keys(text: str) -> list:
+    """Key ``tts_cache`` yang dipakai player untuk ``text``: per klausa di mode streaming."""
+    if _streaming:
+        clauses = split_clauses(text)
+        if len(clauses) > 1:
+            return clauses
+    return [text]
 
 def _tone(duration=0.12, freq=990, sr=24000):
     t = np.linspace(0, duration, int(sr * duration), endpoint=False)
@@ -91,7 +236,8 @@ def _tone(duration=0.12, freq=990, sr=24000):
 def _beep(out_idx=None):
     try:
         y, sr = _tone()
-        sd.play(y, sr, device=out_idx, blocking=True)
+        out = _get_output(out_idx)
+        out.wait(out.enqueue(y, sr))
     except Exception:
         pass
 
@@ -159,14 +305,56 @@ _stop_evt = threading.Event()
 _pause_evt = threading.Event()  # NEW: untuk pause/resume tanpa stop thread
 _out_idx = None
 _out_name = None
+_streaming = True  # sintesis per klausa (lihat _play_streaming_blocking)
 
 def _is_paused():
     """Helper function untuk check pause status"""
     return _pause_evt.is_set()
 
+def _speak(text, pause_check=None, fragments=False):
+    """Sintesis + putar satu teks lewat jalur terbaik yang tersedia.
+
+    ``fragments``: narasi/alert boleh disusun dari fragmen siap pakai (jawaban tidak).
+    """
+    is_paused = pause_check or (lambda: False)
+    print(f"[RTTS] speak -> {text}")
+    tts_busy.set()
+    try:
+        # 1) jalur torch (kalau masih jalan)
+        if synth_torch is not None:
+            try:
+                wav = fragment_bank.render(text, synth=_synth_cached) if fragments else None
+                if wav is not None:
+                    _m_fragment.inc()
+                    _play_wav_bytes_blocking(wav, out_idx=_out_idx, pause_check=pause_check)
+                elif _streaming:
+                    _play_streaming_blocking(text, out_idx=_out_idx, pause_check=pause_check)
+                else:
+                    wav = _synth_cached(text)
+                    # Pass pause check function
+                    _play_wav_bytes_blocking(wav, out_idx=_out_idx, pause_check=pause_check)
+            except Exception as e:
+                print(f"[RTTS] Torch TTS gagal: {e}")
+                # 2) fallback langsung SAPI5
+                _sapi5_speak_blocking(text, pause_check=pause_check)
+        else:
+            # langsung SAPI5
+            _sapi5_speak_blocking(text, pause_check=pause_check)
+
+        # Hanya print done jika tidak di-pause
+        if not is_paused():
+            print(f"[RTTS] done  -> {text}")
+    except Exception as e:
+        print(f"[RTTS] Playback error: {e}")
+        _beep(out_idx=_out_idx)
+    finally:
+        tts_busy.clear()
+
 def _worker_loop(min_gap=0.0):
     global _out_idx, _out_name
 
+    _load_tts_backend()
+
     # Pilih output utk jalur torch (pyttsx3 tidak butuh ini)
     try:
         _out_idx, _out_name = _pick_output_device()
@@ -177,13 +365,18 @@ def _worker_loop(min_gap=0.0):
     except Exception as e:
         print(f"[RTTS] Gagal memilih device audio: {e}")
 
+    try:
+        _get_output(_out_idx)
+    except Exception as e:
+        print(f"[RTTS] Gagal membuka output stream: {e}")
+
     # Health check: bicara "ready" via fallback pipeline paling kuat
     try:
         print("[RTTS] speak -> ready")
         try:
             # coba torch dulu jika ada dan tidak error
             if synth_torch is not None:
-                wav = synth_torch("ready")
+                wav = _synth_cached("ready")
                 _play_wav_bytes_blocking(wav, out_idx=_out_idx)
             else:
                 _sapi5_speak_blocking("ready")
@@ -194,62 +387,64 @@ def _worker_loop(min_gap=0.0):
     except Exception as e:
         print(f"[RTTS] Health check gagal: {e}")
         _beep(out_idx=_out_idx)
+    tts_ready.set()
 
     last_spoken = {}
     while not _stop_evt.is_set():
         try:
-            # Cek apakah sedang di-pause
-            if _pause_evt.is_set():
-                time.sleep(0.1)
+            # Saat di-pause (kamera berhenti) hanya jawaban percakapan yang tetap diucapkan
+            paused = _pause_evt.is_set()
+            item = speak_q.get_item(
+                timeout=0.25,
+                accept=(lambda it: it.priority == PRIORITY_REPLY) if paused else None,
+            )
+            if item is None:
                 continue
-            
-            text = speak_q.get(timeout=0.25)
-            if not text:
-                continue
-            
+            text = item.text
+            is_reply = item.priority == PRIORITY_REPLY
+
             # Cek lagi sebelum speak (case: baru saja di-pause saat ambil dari queue)
-            if _pause_evt.is_set():
+            if not is_reply and _pause_evt.is_set():
                 continue
-                
+
             now = time.time()
-            if min_gap > 0 and now - last_spoken.get(text, 0.0) < min_gap:
+            if not is_reply and min_gap > 0 and now - last_spoken.get(text, 0.0) < min_gap:
                 continue
 
-            print(f"[RTTS] speak -> {text}")
-            tts_busy.set()
+            def interrupted():
+                return _stop_evt.is_set() or speak_q.preempted() or (not is_reply and _pause_evt.is_set())
+
+            speak_q.begin(item)
             try:
-                # 1) jalur torch (kalau masih jalan)
-                if synth_torch is not None:
-                    try:
-                        wav = synth_torch(text)
-                        # Pass pause check function
-                        _play_wav_bytes_blocking(wav, out_idx=_out_idx, pause_check=_is_paused)
-                    except Exception as e:
-                        print(f"[RTTS] Torch TTS gagal: {e}")
-                        # 2) fallback langsung SAPI5
-                        _sapi5_speak_blocking(text, pause_check=_is_paused)
-                else:
-                    # langsung SAPI5
-                    _sapi5_speak_blocking(text, pause_check=_is_paused)
-            
-                # Hanya print done jika tidak di-pause
-                if not _pause_evt.is_set():
-                    print(f"[RTTS] done  -> {text}")
-            except Exception as e:
-                print(f"[RTTS] Playback error: {e}")
-                _beep(out_idx=_out_idx)
+                _speak(text, pause_check=interrupted, fragments=not is_reply)
             finally:
-                tts_busy.clear()
+                if speak_q.end(item):
+                    print(f"[RTTS] preempted -> {text}")
+                    if is_reply:
+                        speak_q.requeue(item)
 
-            last_spoken[text] = time.time()
+            if min_gap > 0:
+                now = time.time()
+                last_spoken[text] = now
+                # Hanya entry yang masih dalam jendela min_gap yang berguna
+                if len(last_spoken) > 256:
+                    last_spoken = {t: ts for t, ts in last_spoken.items() if now - ts < min_gap}
         except Exception:
             time.sleep(0.02)
 
-def start_tts_worker(min_gap=0.0):
-    """Start worker sekali saja. Default tanpa throttle agar cepat terdengar."""
-    global _worker
+    _close_output()
+
+def start_tts_worker(min_gap=0.0, streaming=None):
+    """Start worker sekali saja. Default tanpa throttle agar cepat terdengar.
+
+    ``streaming`` None -> ikut env VISORA_TTS_STREAMING (default aktif).
+    """
+    global _worker, _streaming
     if _worker and _worker.is_alive():
         return
+    if streaming is None:
+        streaming = os.getenv("VISORA_TTS_STREAMING", "1") not in ("0", "false", "no")
+    _streaming = bool(streaming)
     _stop_evt.clear()
     _pause_evt.clear()  # pastikan tidak dalam keadaan pause
     _worker = threading.Thread(target=_worker_loop, kwargs=dict(min_gap=min_gap), daemon=True)
@@ -264,18 +459,17 @@ def stop_tts_worker(flush=True):
     _stop_evt.set()
 
 def pause_tts():
-    """Pause TTS worker tanpa menghentikan thread. Queue akan di-flush dan audio di-stop."""
+    """Pause TTS worker tanpa menghentikan thread. Narasi di-flush dan di-stop; jawaban tetap diputar."""
     _pause_evt.set()
     try:
-        speak_q.flush()
-        # Stop semua audio yang sedang playing
-        try:
-            sd.stop()
-        except:
-            pass
+        speak_q.flush(keep=(PRIORITY_REPLY,))
+        # Stop audio yang sedang playing (di batas blok berikutnya), kecuali kalimat jawaban
+        playing = speak_q.playing()
+        if _output is not None and (playing is None or playing.priority != PRIORITY_REPLY):
+            _output.stop()
     except Exception:
         pass
-    print("[RTTS] TTS paused, queue flushed, and audio stopped")
+    print("[RTTS] TTS paused, narration flushed and stopped")
 
 def resume_tts():
     """Resume TTS worker."""
@@ -291,9 +485,14 @@ def rtts_debug_dump():
             print(f"#{i:02d} out_ch={d.get('max_output_channels',0)} in_ch={d.get('max_input_channels',0)} :: {d.get('name','')}")
         print("=====================")
         print(f"[RTTS] selected torch-out: index={_out_idx} name={_out_name}")
+        print(f"[RTTS] cache: {tts_cache.stats()}")
     except Exception as e:
         print(f"[RTTS] query_devices error: {e}")
 
+def tts_cache_stats():
+    """Counter hit/miss cache audio (untuk debug / UI)."""
+    return tts_cache.stats()
+
 def rtts_self_test():
     try:
         start_tts_worker()
@@ -0,0 +1,219 @@
+# response_cache.py — cache jawaban Gemini per query ternormalisasi (TTL + LRU, opsional ke disk)
+#
+# Query identik yang sedang diproses digabung jadi satu panggilan (coalescing). Audio TTS
+# jawaban bisa ditempel ke entry supaya jawaban dari cache langsung terdengar.
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from metrics import counter
+
+_TRAILING = re.compile(r"[\s.?!,;:…]+$")
+
+
+def normalize_query(text: str) -> str:
+    """'Apa yang ada di depan saya?' == 'apa yang ada  di depan saya'."""
+    return _TRAILING.sub("", " ".join(text.strip().lower().split()))
+
+
+class _Entry:
+    __slots__ = ("reply", "created", "cost", "hits", "audio")
+
+    def __init__(self, reply, created, cost, hits=0, audio=None):
+        self.reply = reply
+        self.created = created
+        self.cost = cost        # detik panggilan model aslinya (latency yang dihemat tiap hit)
+        self.hits = hits
+        self.audio = audio or {}  # key cache TTS (kalimat/klausa) -> WAV bytes
+
+
+class _Flight:
+    __slots__ = ("event", "reply", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.reply = None
+        self.error = None
+
+
+class ResponseCache:
+    """Cache reply teks per query. ``path`` (JSON) opsional; audio disimpan di folder ``<path>_audio``."""
+
+    def __init__(self, ttl=3600.0, max_items=256, path=None, wait_timeout=60.0):
+        self.ttl = ttl
+        self.max_items = max_items
+        self.wait_timeout = wait_timeout  # batas menunggu query identik (stream pemimpin bisa macet)
+        self.path = Path(path) if path else None
+        self._items = OrderedDict()  # key -> _Entry
+        self._inflight = {}          # key -> _Flight
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.saved_s = 0.0
+        self._m_hit = counter("visora_gemini_cache_hits_total", "Jawaban Gemini dari cache")
+        self._m_miss = counter("visora_gemini_cache_misses_total", "Query Gemini yang memanggil model")
+        self._m_coalesced = counter("visora_gemini_cache_coalesced_total", "Query yang menumpang panggilan identik")
+        self._m_saved = counter("visora_gemini_cache_saved_seconds_total", "Latency model yang dihemat cache")
+        if self.path is not None:
+            self._load()
+
+    # ----- disk -----
+    def _audio_dir(self):
+        return self.path.with_name(self.path.stem + "_audio")
+
+    def _audio_file(self, key, sentence):
+        return self._audio_dir() / (hashlib.sha1(f"{key}\0{sentence}".encode("utf-8")).hexdigest() + ".wav")
+
+    def _load(self):
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            print(f"[GeminiCache] Gagal membaca {self.path}: {e}")
+            return
+        now = time.time()
+        for key, e in data.items():
+            if now - e["created"] > self.ttl:
+                continue
+            audio = {}
+            for sentence in e.get("audio", ()):
+                try:
+                    audio[sentence] = self._audio_file(key, sentence).read_bytes()
+                except OSError:
+                    pass
+            self._items[key] = _Entry(e["reply"], e["created"], e.get("cost", 0.0), audio=audio)
+        while len(self._items) > self.max_items:
+            self._items.popitem(last=False)
+        print(f"[GeminiCache] {len(self._items)} jawaban dimuat dari {self.path}")
+
+    def _save(self):
+        if self.path is None:
+            return
+        with self._lock:
+            data = {k: {"reply": e.reply, "created": e.created, "cost": e.cost, "audio": list(e.audio)}
+                    for k, e in self._items.items()}
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"[GeminiCache] Gagal menulis {self.path}: {e}")
+
+    # ----- lookup / coalescing -----
+    def _live(self, key, now):
+        e = self._items.get(key)
+        if e is not None and now - e.created > self.ttl:
+            del self._items[key]
+            return None
+        return e
+
+    def claim(self, query):
+        """("hit", reply) | ("wait", flight) | ("lead", flight). Pemegang "lead" wajib memanggil ``resolve``."""
+        key = normalize_query(query)
+        with self._lock:
+            e = self._live(key, time.time())
+            if e is not None:
+                self._items.move_to_end(key)
+                e.hits += 1
+                self.hits += 1
+                self.saved_s += e.cost
+                self._m_hit.inc()
+                self._m_saved.inc(e.cost)
+                return "hit", e.reply
+            flight = self._inflight.get(key)
+            if flight is not None:
+                self.coalesced += 1
+                self._m_coalesced.inc()
+                return "wait", flight
+            self.misses += 1
+            self._m_miss.inc()
+            flight = self._inflight[key] = _Flight()
+            return "lead", flight
+
+    def resolve(self, query, flight, reply=None, cost=0.0, error=None):
+        key = normalize_query(query)
+        with self._lock:
+            self._inflight.pop(key, None)
+            if error is None and reply:
+                self._items.pop(key, None)
+                self._items[key] = _Entry(reply, time.time(), cost)
+                while len(self._items) > self.max_items:
+                    self._items.popitem(last=False)
+        flight.reply, flight.error = reply, error
+        flight.event.set()
+        if error is None and reply:
+            self._save()
+
+    def wait(self, flight, timeout=None):
+        """Reply dari panggilan pemimpin; TimeoutError setelah ``timeout`` (default ``wait_timeout``)."""
+        if not flight.event.wait(self.wait_timeout if timeout is None else timeout):
+            raise TimeoutError("query identik belum selesai")
+        if flight.error is not None:
+            raise flight.error
+        return flight.reply
+
+    def get_or_call(self, query, fn):
+        """Reply dari cache, dari panggilan identik yang sedang berjalan, atau dari ``fn()``."""
+        kind, value = self.claim(query)
+        if kind == "hit":
+            return value
+        if kind == "wait":
+            return self.wait(value)
+        t0 = time.perf_counter()
+        try:
+            reply = fn()
+        except BaseException as e:
+            self.resolve(query, value, error=e if isinstance(e, Exception) else RuntimeError("dibatalkan"))
+            raise
+        self.resolve(query, value, reply, time.perf_counter() - t0)
+        return reply
+
+    # ----- audio TTS -----
+    def audio(self, query) -> dict:
+        with self._lock:
+            e = self._items.get(normalize_query(query))
+            return dict(e.audio) if e is not None else {}
+
+    def attach_audio(self, query, key, wav):
+        """Tempel audio TTS ke entry ``query``; ``key`` = key cache TTS (kalimat atau klausa)."""
+        data = wav.getvalue() if hasattr(wav, "getvalue") else bytes(wav)
+        qkey = normalize_query(query)
+        with self._lock:
+            e = self._items.get(qkey)
+            if e is None or key in e.audio:
+                return
+            e.audio[key] = data
+        if self.path is not None:
+            try:
+                f = self._audio_file(qkey, key)
+                f.parent.mkdir(parents=True, exist_ok=True)
+                f.write_bytes(data)
+            except OSError as err:
+                print(f"[GeminiCache] Gagal menulis audio: {err}")
+            self._save()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses + self.coalesced
+            return {
+                "entries": len(self._items),
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "hit_rate": round((self.hits + self.coalesced) / total, 3) if total else 0.0,
+                "saved_s": round(self.saved_s, 2),
+                "inflight": len(self._inflight),
+            }
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+        self._save()
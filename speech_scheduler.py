@@ -0,0 +1,179 @@
+# speech_scheduler.py — antrian ucapan berprioritas: deadline, coalescing, dan preemption
+import itertools
+import re
+import threading
+import time
+
+from metrics import counter
+
+# Angka kecil = lebih penting
+PRIORITY_ALERT = 0      # bahaya dekat (orang/kendaraan): boleh memotong ucapan lain
+PRIORITY_REPLY = 1      # jawaban percakapan: FIFO, tidak kadaluarsa
+PRIORITY_NARRATION = 2  # deskripsi scene: latest-wins, basi setelah beberapa detik
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def _tokens(text):
+    return frozenset(w.lower() for w in _WORD.findall(text))
+
+
+def similar(a, b, threshold=0.8):
+    """Jaccard token: 'Saya melihat objek orang, buku' ~ 'Saya melihat objek buku, orang'."""
+    ta, tb = _tokens(a), _tokens(b)
+    if not ta or not tb:
+        return False
+    return len(ta & tb) / len(ta | tb) >= threshold
+
+
+class SpeechItem:
+    __slots__ = ("text", "priority", "deadline", "key", "seq", "created")
+
+    def __init__(self, text, priority, deadline, key, seq):
+        self.text = text
+        self.priority = priority
+        self.deadline = deadline
+        self.key = key
+        self.seq = seq
+        self.created = time.time()
+
+    def expired(self, now):
+        return self.deadline is not None and now > self.deadline
+
+
+class SpeechScheduler:
+    """Pengganti ``_DroppingQueue``: item diambil berdasar (prioritas, urutan masuk).
+
+    - ``key`` sama -> item lama yang belum diucapkan diganti (mis. key "scene" = latest-wins).
+    - tanpa key, teks yang mirip pada prioritas yang sama juga digabung.
+    - item lewat deadline dibuang saat diambil.
+    - item yang lebih penting dari yang sedang diputar menyalakan flag preempt;
+      jalur playback memeriksanya lewat ``preempted()``.
+    """
+
+    def __init__(self, narration_ttl=3.0, alert_ttl=2.0):
+        self.default_ttl = {PRIORITY_ALERT: alert_ttl, PRIORITY_REPLY: None, PRIORITY_NARRATION: narration_ttl}
+        self._items = []
+        self._cv = threading.Condition()
+        self._seq = itertools.count()
+        self._playing = None
+        self._preempt = threading.Event()
+        self._m_coalesced = counter("visora_speech_coalesced_total", "Item ucapan digabung/ditimpa sebelum diucapkan")
+        self._m_expired = counter("visora_speech_expired_total", "Item ucapan dibuang karena lewat deadline")
+        self._m_preempted = counter("visora_speech_preempted_total", "Playback dipotong item berprioritas lebih tinggi")
+
+    # ----- producer -----
+    def put(self, text, priority=PRIORITY_NARRATION, ttl=None, key=None, coalesce=True):
+        if not text:
+            return
+        if ttl is None:
+            ttl = self.default_ttl.get(priority)
+        now = time.time()
+        item = SpeechItem(text, priority, now + ttl if ttl else None, key, next(self._seq))
+        with self._cv:
+            if coalesce:
+                for i, old in enumerate(self._items):
+                    if old.priority != priority:
+                        continue
+                    if (key is not None and old.key == key) or (key is None and old.key is None and similar(old.text, text)):
+                        self._items.pop(i)
+                        self._m_coalesced.inc()
+                        break
+            self._items.append(item)
+            playing = self._playing
+            if playing is not None and priority < playing.priority:
+                self._preempt.set()
+            self._cv.notify_all()
+
+    def put_nowait(self, item):
+        """Kompatibel dengan API lama: string = narasi scene (latest-wins)."""
+        if isinstance(item, SpeechItem):
+            with self._cv:
+                self._items.append(item)
+                self._cv.notify_all()
+            return
+        self.put(item, PRIORITY_NARRATION, key="scene")
+
+    def requeue(self, item):
+        """Kembalikan item (mis. jawaban yang terpotong alert) ke antrian dengan urutan aslinya."""
+        with self._cv:
+            self._items.append(item)
+            self._cv.notify_all()
+
+    # ----- consumer -----
+    def _pop_best(self, accept):
+        now = time.time()
+        alive = []
+        for it in self._items:
+            if it.expired(now):
+                self._m_expired.inc()
+            else:
+                alive.append(it)
+        self._items = alive
+        best = None
+        for it in alive:
+            if accept is not None and not accept(it):
+                continue
+            if best is None or (it.priority, it.seq) < (best.priority, best.seq):
+                best = it
+        if best is not None:
+            self._items.remove(best)
+        return best
+
+    def get_item(self, timeout=None, accept=None):
+        """Ambil item terpenting (opsional difilter ``accept``), atau None kalau timeout."""
+        end = None if timeout is None else time.time() + timeout
+        with self._cv:
+            while True:
+                item = self._pop_best(accept)
+                if item is not None:
+                    return item
+                remaining = None if end is None else end - time.time()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._cv.wait(timeout=remaining)
+
+    def get(self, timeout=None):
+        item = self.get_item(timeout)
+        return item.text if item is not None else None
+
+    # ----- status playback -----
+    def begin(self, item):
+        with self._cv:
+            self._playing = item
+            self._preempt.clear()
+            # Item penting yang sudah menunggu juga boleh memotong
+            if any(it.priority < item.priority for it in self._items):
+                self._preempt.set()
+
+    def playing(self):
+        """Item yang sedang diputar (None kalau idle)."""
+        with self._cv:
+            return self._playing
+
+    def preempted(self) -> bool:
+        return self._preempt.is_set()
+
+    def end(self, item) -> bool:
+        """Selesai memutar ``item``; return True kalau tadi dipotong preemption."""
+        with self._cv:
+            was = self._preempt.is_set()
+            self._playing = None
+            self._preempt.clear()
+        if was:
+            self._m_preempted.inc()
+        return was
+
+    # ----- lain-lain -----
+    def flush(self, keep=()):
+        """Buang semua item kecuali prioritas di ``keep``."""
+        with self._cv:
+            self._items = [it for it in self._items if it.priority in keep]
+
+    def wake(self):
+        with self._cv:
+            self._cv.notify_all()
+
+    def depth(self) -> int:
+        with self._cv:
+            return len(self._items)
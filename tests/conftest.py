@@ -0,0 +1,5 @@
+# Modul VISORA ada di root repo (flat), jadi root repo dimasukkan ke sys.path untuk test
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
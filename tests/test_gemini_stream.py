@@ -0,0 +1,53 @@
+import pytest
+
+import gemini_module
+from gemini_module import gemini_stream_sentences, iter_sentences
+
+
+class StubChain:
+    """Chain palsu: ``stream`` mengembalikan potongan token seperti model sungguhan."""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.calls = 0
+
+    def stream(self, inputs):
+        self.calls += 1
+        yield from self.chunks
+
+    def invoke(self, inputs):
+        self.calls += 1
+        return "".join(self.chunks)
+
+
+def test_iter_sentences_splits_on_sentence_end_only():
+    chunks = ["Harga", "nya 3.5 ribu. Lihat www.", "x.com ya! ", "Terima kasih"]
+    assert list(iter_sentences(chunks)) == ["Harganya 3.5 ribu.", "Lihat www.x.com ya!", "Terima kasih"]
+
+
+def test_iter_sentences_yields_before_stream_ends():
+    def chunks():
+        yield "Kalimat satu. "
+        raise RuntimeError("stream putus")
+
+    it = iter_sentences(chunks())
+    assert next(it) == "Kalimat satu."
+    with pytest.raises(RuntimeError):
+        next(it)
+
+
+def test_stream_sentences_with_stub_chain_without_cache():
+    chain = StubChain(["Ada ", "kursi. Ada", " meja.\n", "Selesai"])
+    assert list(gemini_stream_sentences("apa itu", chain=chain, cache=False)) == ["Ada kursi.", "Ada meja.", "Selesai"]
+    assert chain.calls == 1
+
+
+def test_get_response_with_stub_chain_without_cache():
+    chain = StubChain(["Halo ", "juga."])
+    assert gemini_module.gemini_get_response("halo", chain=chain, cache=False) == "Halo juga."
+
+
+def test_build_chain_with_fake_chat_model():
+    fake = pytest.importorskip("langchain_core.language_models.fake_chat_models")
+    chain = gemini_module.build_chain(fake.FakeListChatModel(responses=["Ada kursi. Ada meja."]))
+    assert list(gemini_stream_sentences("apa itu", chain=chain, cache=False)) == ["Ada kursi.", "Ada meja."]
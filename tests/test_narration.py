@@ -0,0 +1,12 @@
+from narration import NarrationState, count_word
+
+
+def test_count_word():
+    assert [count_word(n) for n in (2, 10, 11, 15, 21)] == ["dua", "sepuluh", "sebelas", "lima belas", "dua puluh satu"]
+
+
+def test_delta_counts_are_spelled_out():
+    state = NarrationState(appear_after=1, vanish_after=1)
+    assert state.update(labels=["person", "person", "chair"], now=0) == ["ada chair baru", "ada dua person baru"]
+    assert state.update(labels=[], now=1) == ["chair hilang", "dua person hilang"]
+    assert not any(ch.isdigit() for ch in " ".join(state.update(labels=["cup"] * 3, now=2)))
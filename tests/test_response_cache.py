@@ -0,0 +1,148 @@
+import threading
+import time
+
+import pytest
+
+import response_cache as rc
+from response_cache import ResponseCache, normalize_query
+
+
+def test_normalize_query():
+    assert normalize_query("  Apa yang ada di depan  saya? ") == "apa yang ada di depan saya"
+
+
+def test_hit_after_first_call():
+    cache = ResponseCache()
+    calls = []
+    fn = lambda: calls.append(1) or "Ada meja."
+    assert cache.get_or_call("Apa itu?", fn) == "Ada meja."
+    assert cache.get_or_call("apa itu", fn) == "Ada meja."
+    assert len(calls) == 1
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_identical_inflight_queries_coalesce():
+    cache = ResponseCache()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "Jawaban."
+
+    results = []
+    lead = threading.Thread(target=lambda: results.append(cache.get_or_call("halo", slow)))
+    lead.start()
+    assert started.wait(5)
+    waiters = [threading.Thread(target=lambda: results.append(cache.get_or_call("Halo!", slow))) for _ in range(3)]
+    for t in waiters:
+        t.start()
+    while cache.stats()["coalesced"] < 3:
+        time.sleep(0.01)
+    release.set()
+    for t in [lead] + waiters:
+        t.join(5)
+    assert results == ["Jawaban."] * 4
+    assert len(calls) == 1
+    assert cache.stats()["coalesced"] == 3
+
+
+def test_leader_error_reaches_waiters_and_is_not_cached():
+    cache = ResponseCache()
+    kind, flight = cache.claim("q")
+    assert kind == "lead"
+    kind2, flight2 = cache.claim("q")
+    assert kind2 == "wait" and flight2 is flight
+    cache.resolve("q", flight, error=RuntimeError("boom"))
+    with pytest.raises(RuntimeError):
+        cache.wait(flight2)
+    assert cache.claim("q")[0] == "lead"
+
+
+def test_wait_times_out():
+    cache = ResponseCache(wait_timeout=0.05)
+    cache.claim("q")
+    kind, flight = cache.claim("q")
+    assert kind == "wait"
+    with pytest.raises(TimeoutError):
+        cache.wait(flight)
+
+
+def test_ttl_expiry(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(rc.time, "time", lambda: now[0])
+    cache = ResponseCache(ttl=10)
+    cache.get_or_call("q", lambda: "a")
+    now[0] += 5
+    assert cache.claim("q") == ("hit", "a")
+    now[0] += 6
+    assert cache.claim("q")[0] == "lead"
+
+
+def test_lru_eviction():
+    cache = ResponseCache(max_items=2)
+    cache.get_or_call("a", lambda: "A")
+    cache.get_or_call("b", lambda: "B")
+    cache.get_or_call("a", lambda: "A2")  # "a" jadi paling baru dipakai
+    cache.get_or_call("c", lambda: "C")   # "b" dibuang
+    assert cache.stats()["entries"] == 2
+    assert cache.claim("a") == ("hit", "A")
+    assert cache.claim("c") == ("hit", "C")
+    assert cache.claim("b")[0] == "lead"
+
+
+def test_reload_from_disk_with_audio(tmp_path):
+    path = tmp_path / "gemini_cache.json"
+    cache = ResponseCache(path=path)
+    cache.get_or_call("Apa itu?", lambda: "Itu kursi. Warnanya merah.")
+    cache.attach_audio("apa itu", "Itu kursi.", b"RIFFfake")
+
+    again = ResponseCache(path=path)
+    assert again.claim("apa itu?") == ("hit", "Itu kursi. Warnanya merah.")
+    assert again.audio("Apa itu") == {"Itu kursi.": b"RIFFfake"}
+
+
+def test_reload_skips_expired(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(rc.time, "time", lambda: now[0])
+    path = tmp_path / "gemini_cache.json"
+    ResponseCache(ttl=10, path=path).get_or_call("q", lambda: "a")
+    now[0] += 20
+    assert ResponseCache(ttl=10, path=path).stats()["entries"] == 0
+
+
+def test_reply_audio_is_keyed_by_player_clauses():
+    from io import BytesIO
+
+    import gemini_module
+    from text_clauses import split_clauses
+    from tts_cache import AudioCache
+
+    class StubChain:
+        def stream(self, inputs):
+            yield "Di depan ada kursi merah, meja kayu, dan lampu belajar. "
+            yield "Selesai."
+
+    reply_cache, tts = ResponseCache(), AudioCache()
+
+    def keys(sentence):
+        clauses = split_clauses(sentence)
+        return clauses if len(clauses) > 1 else [sentence]
+
+    sentences = list(gemini_module.gemini_stream_sentences("q", chain=StubChain(), cache=reply_cache,
+                                                           audio_cache=tts, audio_keys=keys))
+    all_keys = [k for s in sentences for k in keys(s)]
+    assert len(all_keys) > len(sentences)  # kalimat pertama dipecah per klausa oleh player
+    for k in all_keys:
+        tts.put(k, BytesIO(b"RIFF" + k.encode()))
+
+    # Hit berikutnya menempelkan audio per klausa ke entry cache jawaban
+    list(gemini_module.gemini_stream_sentences("q", cache=reply_cache, audio_cache=tts, audio_keys=keys))
+    assert set(reply_cache.audio("q")) == set(all_keys)
+
+    # Cache TTS kosong (mis. restart): audio dikembalikan dengan key yang dibaca player
+    fresh = AudioCache()
+    list(gemini_module.gemini_stream_sentences("q", cache=reply_cache, audio_cache=fresh, audio_keys=keys))
+    assert all(fresh.get(k) is not None for k in all_keys)
@@ -0,0 +1,47 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from vad import EnergyVAD, split_speech
+
+SR = 16000
+
+
+def _noise(seconds, dbfs, rng):
+    # RMS white noise pada level dBFS tertentu
+    return (rng.standard_normal(int(SR * seconds)) * 10 ** (dbfs / 20)).astype(np.float32)
+
+
+def _tone(seconds, dbfs, freq=220.0):
+    t = np.arange(int(SR * seconds)) / SR
+    return (np.sqrt(2) * 10 ** (dbfs / 20) * np.sin(2 * np.pi * freq * t)).astype(np.float32)
+
+
+def test_quiet_room_speech_burst():
+    rng = np.random.default_rng(0)
+    audio = np.concatenate([_noise(1.0, -70, rng), _tone(1.0, -20) + _noise(1.0, -70, rng), _noise(1.5, -70, rng)])
+    segs = split_speech(audio, SR)
+    assert len(segs) == 1
+    assert abs(segs[0].start / SR - 1.0) < 0.25
+    assert abs(segs[0].end / SR - 2.0) < 0.3
+
+
+def test_noise_bed_above_min_db_does_not_stay_voiced():
+    rng = np.random.default_rng(1)
+    bed = lambda s: _noise(s, -40, rng)
+    audio = np.concatenate([bed(3.0), _tone(1.0, -15) + bed(1.0), bed(3.0)])
+    vad = EnergyVAD(sample_rate=SR)
+    events = []
+    # Potongan 20 ms seperti WebRTC
+    step = int(SR * 0.02)
+    for i in range(0, len(audio), step):
+        events += vad.feed(audio[i:i + step], now=i / SR)
+
+    segs = [e for kind, e in events if kind == "segment"]
+    turns = [e for kind, e in events if kind == "turn_end"]
+    # Noise bed tidak jadi segmen 12 detik; hanya burst ucapan yang keluar, lalu giliran selesai
+    assert len(segs) == 1
+    assert abs(segs[0].start / SR - 3.0) < 0.3
+    assert abs(segs[0].end / SR - 4.0) < 0.4
+    assert len(turns) == 1
+    assert vad.noise_db > -45
@@ -0,0 +1,33 @@
+# text_clauses.py — pecah kalimat per klausa untuk TTS streaming (tanpa dependensi berat)
+#
+# Dipakai realtime_tts (sintesis per klausa) dan gemini_module (audio jawaban di cache
+# disimpan dengan key klausa yang sama dengan yang dipakai player).
+import re
+
+_CLAUSE_SPLIT = re.compile(r"(?<=[.,;:!?])\s+")
+
+def split_clauses(text: str, min_chars: int = 12, max_chars: int = 120) -> list:
+    """Pecah kalimat di batas klausa/koma.
+
+    Potongan yang terlalu pendek (mis. satu label objek) digabung ke potongan
+    sebelumnya, potongan yang terlalu panjang dipecah di spasi terdekat.
+    """
+    pieces = [p.strip() for p in _CLAUSE_SPLIT.split(text.strip()) if p.strip()]
+    chunks = []
+    for p in pieces:
+        if chunks and (len(p) < min_chars or len(chunks[-1]) < min_chars) \
+                and len(chunks[-1]) + 1 + len(p) <= max_chars:
+            chunks[-1] = chunks[-1] + " " + p
+        else:
+            chunks.append(p)
+    out = []
+    for c in chunks:
+        while len(c) > max_chars:
+            cut = c.rfind(" ", 0, max_chars)
+            if cut <= 0:
+                cut = max_chars
+            out.append(c[:cut].strip())
+            c = c[cut:].strip()
+        if c:
+            out.append(c)
+    return out
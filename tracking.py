@@ -0,0 +1,132 @@
+# tracking.py — tracker ringan antar keyframe YOLO + ID objek yang stabil
+import itertools
+import time
+
+import cv2
+import numpy as np
+
+
+class Detection:
+    """Satu objek: box xyxy (float32), kelas, skor, dan track ID (None kalau tanpa tracking)."""
+
+    __slots__ = ("box", "cls", "score", "id")
+
+    def __init__(self, box, cls, score, id=None):
+        self.box = np.asarray(box, dtype=np.float32)
+        self.cls = int(cls)
+        self.score = float(score)
+        self.id = id
+
+
+def detections_from_results(results):
+    """Ultralytics Results -> list Detection."""
+    if not results or results[0].boxes is None:
+        return []
+    boxes = results[0].boxes
+    return [
+        Detection(box, cls, conf)
+        for box, cls, conf in zip(
+            boxes.xyxy.cpu().numpy(),
+            boxes.cls.cpu().numpy(),
+            boxes.conf.cpu().numpy(),
+        )
+    ]
+
+
+def iou(a, b):
+    x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+    x2, y2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0.0, x2 - x1) * max(0.0, y2 - y1)
+    if inter <= 0:
+        return 0.0
+    area_a = (a[2] - a[0]) * (a[3] - a[1])
+    area_b = (b[2] - b[0]) * (b[3] - b[1])
+    return inter / (area_a + area_b - inter + 1e-6)
+
+
+def _create_cv_tracker(kind):
+    # MOSSE/KCF ada di opencv-contrib (cv2.legacy); KCF juga ada di build biasa
+    legacy = getattr(cv2, "legacy", None)
+    makers = {
+        "mosse": [getattr(legacy, "TrackerMOSSE_create", None)],
+        "kcf": [getattr(legacy, "TrackerKCF_create", None), getattr(cv2, "TrackerKCF_create", None)],
+        "csrt": [getattr(legacy, "TrackerCSRT_create", None), getattr(cv2, "TrackerCSRT_create", None)],
+    }
+    for make in makers.get(kind, []) + makers["kcf"]:
+        if make is not None:
+            return make()
+    raise RuntimeError("OpenCV tracker tidak tersedia (butuh opencv-contrib-python)")
+
+
+class Track(Detection):
+    __slots__ = ("tracker", "misses", "updated_at")
+
+
+class ObjectTracker:
+    """Keyframe = hasil YOLO (kebenaran), di antaranya box dibawa maju oleh tracker OpenCV.
+
+    ID dipertahankan lewat pencocokan IoU ke track lama dengan kelas yang sama.
+    """
+
+    def __init__(self, kind="mosse", iou_match=0.3, max_misses=3):
+        self.kind = kind
+        self.iou_match = iou_match
+        self.max_misses = max_misses
+        self.tracks = []
+        self._ids = itertools.count(1)
+
+    def on_keyframe(self, frame, detections):
+        old = list(self.tracks)
+        new_tracks = []
+        # Greedy: skor tertinggi dapat ID lama duluan
+        for det in sorted(detections, key=lambda d: -d.score):
+            best, best_iou = None, self.iou_match
+            for t in old:
+                if t.cls != det.cls:
+                    continue
+                v = iou(t.box, det.box)
+                if v >= best_iou:
+                    best, best_iou = t, v
+            if best is not None:
+                old.remove(best)
+                tid = best.id
+            else:
+                tid = next(self._ids)
+            new_tracks.append(self._start(frame, det, tid))
+        self.tracks = [t for t in new_tracks if t is not None]
+        return list(self.tracks)
+
+    def _start(self, frame, det, tid):
+        t = Track(det.box, det.cls, det.score, tid)
+        t.misses = 0
+        t.updated_at = time.time()
+        x1, y1, x2, y2 = det.box
+        w, h = max(1.0, x2 - x1), max(1.0, y2 - y1)
+        try:
+            t.tracker = _create_cv_tracker(self.kind)
+            t.tracker.init(frame, (int(x1), int(y1), int(w), int(h)))
+        except Exception as e:
+            print(f"[Track] init gagal untuk #{tid}: {e}")
+            t.tracker = None
+        return t
+
+    def update(self, frame):
+        alive = []
+        now = time.time()
+        for t in self.tracks:
+            ok = False
+            if t.tracker is not None:
+                ok, (x, y, w, h) = t.tracker.update(frame)
+            if ok:
+                t.box = np.array([x, y, x + w, y + h], dtype=np.float32)
+                t.misses = 0
+                t.updated_at = now
+            else:
+                t.misses += 1
+            if t.misses <= self.max_misses:
+                alive.append(t)
+        self.tracks = alive
+        return list(self.tracks)
+
+    def reset(self):
+        self.tracks = []
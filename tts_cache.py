@@ -0,0 +1,154 @@
+# tts_cache.py — cache audio hasil sintesis per-utterance (LRU berdasarkan ukuran byte, opsional disimpan ke disk)
+import hashlib, os, threading, time
+from collections import OrderedDict
+from io import BytesIO
+from pathlib import Path
+
+
+def normalize_text(text: str) -> str:
+    """Normalisasi ringan supaya 'Saya melihat  objek X' dan 'saya melihat objek x' jadi satu entry."""
+    return " ".join(text.strip().lower().split())
+
+
+class AudioCache:
+    """Content-addressed cache WAV bytes, dibatasi total byte dengan eviksi LRU.
+
+    Kalau ``cache_dir`` diisi, setiap entry juga ditulis sebagai ``<key>.wav`` sehingga
+    cache tetap ada setelah restart. Isi disk selalu mengikuti isi memori.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, cache_dir=None, voice="speecht5-7306"):
+        self.max_bytes = int(max_bytes)
+        self.voice = voice
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self._items = OrderedDict()  # key -> wav bytes
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if self.cache_dir is not None:
+            try:
+                self.cache_dir.mkdir(parents=True, exist_ok=True)
+                self._load_dir()
+            except Exception as e:
+                print(f"[TTSCache] Gagal membuka cache dir {self.cache_dir}: {e}")
+                self.cache_dir = None
+
+    def key(self, text: str) -> str:
+        raw = f"{self.voice}\0{normalize_text(text)}".encode("utf-8")
+        return hashlib.sha1(raw).hexdigest()
+
+    # ----- disk -----
+    def _path(self, key):
+        return self.cache_dir / f"{key}.wav"
+
+    def _load_dir(self):
+        # Paling baru dipakai dulu (mtime di-update saat hit), sisanya dibuang
+        files = sorted(self.cache_dir.glob("*.wav"), key=lambda p: p.stat().st_mtime, reverse=True)
+        loaded = []
+        for p in files:
+            size = p.stat().st_size
+            if self._bytes + size > self.max_bytes:
+                try:
+                    p.unlink()
+                except OSError:
+                    pass
+                continue
+            loaded.append((p.stem, p.read_bytes()))
+            self._bytes += size
+        # OrderedDict: paling lama di depan
+        for key, data in reversed(loaded):
+            self._items[key] = data
+        if loaded:
+            print(f"[TTSCache] {len(loaded)} utterance dimuat dari {self.cache_dir}")
+
+    def _write_file(self, key, data):
+        if self.cache_dir is None:
+            return
+        try:
+            tmp = self._path(key).with_suffix(".tmp")
+            tmp.write_bytes(data)
+            os.replace(tmp, self._path(key))
+        except OSError as e:
+            print(f"[TTSCache] Gagal menulis {key}: {e}")
+
+    def _remove_file(self, key):
+        if self.cache_dir is None:
+            return
+        try:
+            self._path(key).unlink()
+        except OSError:
+            pass
+
+    def _touch_file(self, key):
+        if self.cache_dir is None:
+            return
+        try:
+            now = time.time()
+            os.utime(self._path(key), (now, now))
+        except OSError:
+            pass
+
+    # ----- API -----
+    def get(self, text: str):
+        """Return BytesIO baru (posisi 0) atau None kalau belum ada."""
+        k = self.key(text)
+        with self._lock:
+            data = self._items.get(k)
+            if data is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(k)
+            self.hits += 1
+        self._touch_file(k)
+        return BytesIO(data)
+
+    def put(self, text: str, wav):
+        data = wav.getvalue() if isinstance(wav, BytesIO) else bytes(wav)
+        if len(data) > self.max_bytes:
+            return
+        k = self.key(text)
+        evicted = []
+        with self._lock:
+            old = self._items.pop(k, None)
+            if old is not None:
+                self._bytes -= len(old)
+            self._items[k] = data
+            self._bytes += len(data)
+            while self._bytes > self.max_bytes and self._items:
+                ek, ev = self._items.popitem(last=False)
+                self._bytes -= len(ev)
+                evicted.append(ek)
+        self._write_file(k, data)
+        for ek in evicted:
+            self._remove_file(ek)
+
+    def get_or_synth(self, text: str, synth) -> BytesIO:
+        """Ambil dari cache, atau panggil ``synth(text)`` lalu simpan hasilnya."""
+        buf = self.get(text)
+        if buf is not None:
+            return buf
+        wav = synth(text)
+        self.put(text, wav)
+        wav.seek(0)
+        return wav
+
+    def clear(self):
+        with self._lock:
+            keys = list(self._items)
+            self._items.clear()
+            self._bytes = 0
+        for k in keys:
+            self._remove_file(k)
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._items),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / total) if total else 0.0,
+            }
@@ -30,26 +30,110 @@
 #     return buffer
 
 # tts_model.py
+import os
 from functools import lru_cache
+from pathlib import Path
 from transformers import SpeechT5Processor, SpeechT5ForTextToSpeech, SpeechT5HifiGan
-from datasets import load_dataset
+import numpy as np
 import torch, soundfile as sf
 from io import BytesIO
+from metrics import timed
 
-@lru_cache(maxsize=1)
-def _load_bundle():
+SPEAKER_INDEX = 7306
+# x-vector speaker (512 float32, ~2 KB); dataset cmu-arctic-xvectors hanya dipakai kalau file ini belum ada
+SPEAKER_EMBEDDING = Path(os.getenv(
+    "VISORA_SPEAKER_EMBEDDING",
+    Path(__file__).parent / "assets" / f"speaker_xvector_{SPEAKER_INDEX}.npy",
+))
+
+def load_speaker_embedding(path=SPEAKER_EMBEDDING, index=SPEAKER_INDEX):
+    """x-vector dari asset .npy lokal; kalau belum ada, ambil sekali dari dataset lalu simpan."""
+    path = Path(path)
+    if path.exists():
+        return torch.from_numpy(np.load(path).astype(np.float32)).unsqueeze(0)
+    from datasets import load_dataset
+
+    print(f"[TTS] {path} belum ada, mengambil x-vector #{index} dari cmu-arctic-xvectors")
+    xvec = np.asarray(load_dataset("Matthijs/cmu-arctic-xvectors", split="validation")[index]["xvector"],
+                      dtype=np.float32)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        np.save(path, xvec)
+    except OSError as e:
+        print(f"[TTS] Gagal menyimpan {path}: {e}")
+    return torch.from_numpy(xvec).unsqueeze(0)
+
+def _env_flag(name, default="0"):
+    return os.getenv(name, default).strip().lower() in ("1", "true", "yes", "on")
+
+def tts_config(**overrides) -> dict:
+    """Mode TTS dari env, bisa ditimpa lewat argumen (None = pakai env).
+
+    VISORA_TTS_INT8          dynamic int8 pada nn.Linear SpeechT5 (encoder/decoder transformer)
+    VISORA_TTS_THREADS       batas thread intra-op torch (0 = biarkan default torch)
+    VISORA_TTS_TRACE_VOCODER HiFiGAN di-trace + freeze dengan TorchScript
+    """
+    cfg = {
+        "int8": _env_flag("VISORA_TTS_INT8"),
+        "threads": int(os.getenv("VISORA_TTS_THREADS", "0")) or None,
+        "trace_vocoder": _env_flag("VISORA_TTS_TRACE_VOCODER"),
+    }
+    cfg.update({k: v for k, v in overrides.items() if v is not None})
+    return cfg
+
+def _trace_vocoder(vocoder):
+    """HiFiGAN murni konvolusi, jadi graph hasil trace berlaku untuk panjang spektrogram berapa pun."""
+    try:
+        example = torch.randn(50, vocoder.config.model_in_dim)
+        with torch.inference_mode():
+            traced = torch.jit.trace(vocoder, example, check_trace=False)
+        return torch.jit.freeze(traced.eval())
+    except Exception as e:
+        print(f"[TTS] Trace vocoder gagal, pakai eager: {e}")
+        return vocoder
+
+@lru_cache(maxsize=4)
+def _load_bundle(int8=False, trace_vocoder=False):
     processor = SpeechT5Processor.from_pretrained("microsoft/speecht5_tts")
-    model = SpeechT5ForTextToSpeech.from_pretrained("microsoft/speecht5_tts")
-    vocoder = SpeechT5HifiGan.from_pretrained("microsoft/speecht5_hifigan")
-    xvec = load_dataset("Matthijs/cmu-arctic-xvectors", split="validation")
-    spk = torch.tensor(xvec[7306]["xvector"]).unsqueeze(0)
+    model = SpeechT5ForTextToSpeech.from_pretrained("microsoft/speecht5_tts").eval()
+    vocoder = SpeechT5HifiGan.from_pretrained("microsoft/speecht5_hifigan").eval()
+    if int8:
+        # HiFiGAN hampir tanpa Linear; yang berat per token adalah decoder transformer SpeechT5
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    if trace_vocoder:
+        vocoder = _trace_vocoder(vocoder)
+    spk = load_speaker_embedding()
+    print(f"[TTS] SpeechT5 siap (int8={int8}, trace_vocoder={trace_vocoder}, threads={torch.get_num_threads()})")
     return processor, model, vocoder, spk
 
-def synthesize_speech(text: str) -> BytesIO:
-    processor, model, vocoder, spk = _load_bundle()
-    ids = processor(text=text, return_tensors="pt")["input_ids"]
-    wav = model.generate_speech(ids, spk, vocoder=vocoder)
+def load_bundle(**overrides):
+    """(processor, model, vocoder, speaker) untuk konfigurasi ``tts_config(**overrides)``.
+
+    Jumlah thread torch berlaku untuk seluruh proses (termasuk YOLO backend torch); pakai nilai
+    kecil supaya TTS tidak menghabiskan core yang dipakai thread deteksi.
+    """
+    cfg = tts_config(**overrides)
+    if cfg["threads"] and torch.get_num_threads() != cfg["threads"]:
+        torch.set_num_threads(cfg["threads"])
+    return _load_bundle(bool(cfg["int8"]), bool(cfg["trace_vocoder"]))
+
+def warmup():
+    """Muat model + satu sintesis pendek supaya kalimat pertama tidak membayar inisialisasi."""
+    synthesize_speech("ok")
+
+def generate(text: str, bundle=None):
+    """Waveform float32 16 kHz (numpy) untuk ``text``."""
+    processor, model, vocoder, spk = bundle or load_bundle()
+    with torch.inference_mode():
+        ids = processor(text=text, return_tensors="pt")["input_ids"]
+        wav = model.generate_speech(ids, spk, vocoder=vocoder)
+    return wav.numpy()
+
+def synthesize_speech(text: str, bundle=None) -> BytesIO:
+    with timed("visora_tts_synth_seconds", "Durasi sintesis SpeechT5 + HiFiGAN"):
+        wav = generate(text, bundle)
     buf = BytesIO()
-    sf.write(buf, wav.numpy(), samplerate=16000, format="WAV")
+    sf.write(buf, wav, samplerate=16000, format="WAV")
     buf.seek(0)
     return buf
+
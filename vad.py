@@ -0,0 +1,159 @@
+# vad.py — voice activity detection berbasis energi (tanpa model), streaming maupun offline
+#
+# Frame 30 ms dianggap bersuara kalau energinya > noise floor adaptif + margin. Segmen ditutup
+# setelah hening ``hangover_ms``; giliran bicara (turn) dianggap selesai setelah hening ``turn_end_ms``.
+# Noise floor turun lewat EMA di frame hening dan naik lewat minimum energi ``noise_window_ms``
+# terakhir (kipas/ruang ramai yang stabil di atas ``min_db`` tidak terus dianggap ucapan).
+from collections import deque
+
+import numpy as np
+
+
+class SpeechSegment:
+    __slots__ = ("start", "end", "audio", "end_wall")
+
+    def __init__(self, start, end, audio, end_wall):
+        self.start = start          # indeks sampel (sejak reset)
+        self.end = end
+        self.audio = audio          # float32 mono
+        self.end_wall = end_wall    # waktu dinding saat frame bersuara terakhir diterima
+
+
+class EnergyVAD:
+    """``feed(samples, now)`` -> list event ``("segment", SpeechSegment)`` / ``("turn_end", end_wall)``."""
+
+    def __init__(self, sample_rate=16000, frame_ms=30, margin_db=10.0, min_db=-50.0, start_frames=3,
+                 hangover_ms=300, pad_ms=150, min_speech_ms=200, max_segment_s=12.0, turn_end_ms=700,
+                 noise_window_ms=2000):
+        self.sample_rate = sample_rate
+        self.frame = int(sample_rate * frame_ms / 1000)
+        self.frame_ms = frame_ms
+        self.margin_db = margin_db
+        self.min_db = min_db
+        self.start_frames = start_frames
+        self.hangover_frames = max(1, hangover_ms // frame_ms)
+        self.pad_frames = pad_ms // frame_ms
+        self.min_speech_frames = max(1, min_speech_ms // frame_ms)
+        self.max_segment_frames = int(max_segment_s * 1000 / frame_ms)
+        self.turn_end_frames = max(1, turn_end_ms // frame_ms)
+        self.noise_window_frames = max(1, noise_window_ms // frame_ms)
+        self.reset()
+
+    def reset(self):
+        self.noise_db = self.min_db - self.margin_db
+        self._recent_db = deque(maxlen=self.noise_window_frames)
+        self._seg_peak_db = -float("inf")
+        self._buf = np.zeros(0, dtype=np.float32)
+        self._pos = 0                    # indeks sampel frame berikutnya
+        self._pre = deque(maxlen=self.pad_frames + self.start_frames)
+        self._cur = None                 # list frame segmen aktif
+        self._cur_start = 0
+        self._voiced_run = 0
+        self._voiced_in_seg = 0
+        self._silence_run = 0
+        self._turn_open = False
+        self._turn_silence = 0
+        self._last_voiced_wall = None
+
+    def _threshold(self):
+        return max(self.min_db, self.noise_db + self.margin_db)
+
+    def _is_voiced(self, frame):
+        db = 10.0 * np.log10(float(np.mean(frame * frame)) + 1e-10)
+        self._recent_db.append(db)
+        if len(self._recent_db) == self._recent_db.maxlen:
+            floor = min(self._recent_db)
+            if floor > self.noise_db:
+                # Semua frame di jendela di atas floor lama: itu noise stabil, bukan ucapan
+                self.noise_db = floor
+                if self._cur is not None and self._seg_peak_db <= self._threshold():
+                    # Segmen aktif ternyata hanya noise (tidak ada frame di atas threshold baru)
+                    self._cur = None
+                    self._voiced_in_seg = 0
+                    self._voiced_run = 0
+        voiced = db > self._threshold()
+        if not voiced and self._cur is None:
+            # Turun cepat lewat EMA, hanya di luar ucapan
+            self.noise_db = 0.95 * self.noise_db + 0.05 * db
+        if self._cur is None and not voiced:
+            self._seg_peak_db = -float("inf")
+        else:
+            # Puncak energi sejak awal run bersuara / segmen aktif
+            self._seg_peak_db = max(self._seg_peak_db, db)
+        return voiced
+
+    def _close(self, events, keep_tail):
+        # Hening di ekor segmen dibuang, sisakan ``keep_tail`` frame sebagai padding
+        drop = max(0, self._silence_run - keep_tail)
+        frames = self._cur[:len(self._cur) - drop]
+        if self._voiced_in_seg >= self.min_speech_frames and frames:
+            audio = np.concatenate(frames)
+            events.append(("segment", SpeechSegment(self._cur_start, self._cur_start + len(audio), audio,
+                                                    self._last_voiced_wall)))
+            self._turn_open = True
+        self._cur = None
+        self._voiced_in_seg = 0
+        self._seg_peak_db = -float("inf")
+
+    def feed(self, samples, now=None):
+        events = []
+        samples = np.asarray(samples, dtype=np.float32).reshape(-1)
+        buf = np.concatenate([self._buf, samples]) if len(self._buf) else samples
+        n = len(buf) // self.frame
+        for i in range(n):
+            frame = buf[i * self.frame:(i + 1) * self.frame]
+            voiced = self._is_voiced(frame)
+            if self._cur is None:
+                self._pre.append(frame)
+                self._voiced_run = self._voiced_run + 1 if voiced else 0
+                if self._turn_open and not voiced:
+                    self._turn_silence += 1
+                    if self._turn_silence >= self.turn_end_frames:
+                        events.append(("turn_end", self._last_voiced_wall))
+                        self._turn_open = False
+                if self._voiced_run >= self.start_frames:
+                    self._cur = list(self._pre)
+                    self._cur_start = self._pos - (len(self._pre) - 1) * self.frame
+                    self._voiced_in_seg = self._voiced_run
+                    self._silence_run = 0
+                    self._turn_silence = 0
+                    self._last_voiced_wall = now
+                    self._pre.clear()
+            else:
+                self._cur.append(frame)
+                if voiced:
+                    self._voiced_in_seg += 1
+                    self._silence_run = 0
+                    self._last_voiced_wall = now
+                else:
+                    self._silence_run += 1
+                if self._silence_run >= self.hangover_frames:
+                    self._close(events, keep_tail=self.pad_frames)
+                    self._turn_silence = self._silence_run
+                    self._voiced_run = 0
+                elif len(self._cur) >= self.max_segment_frames:
+                    # Ucapan panjang dipecah supaya transkripsi bisa jalan sambil user masih bicara
+                    self._close(events, keep_tail=self.pad_frames)
+                    self._cur = []
+                    self._cur_start = self._pos + self.frame
+                    self._silence_run = 0
+            self._pos += self.frame
+        self._buf = buf[n * self.frame:].copy()
+        return events
+
+    def flush(self, now=None):
+        """Tutup segmen aktif dan giliran yang masih terbuka (akhir rekaman)."""
+        events = []
+        if self._cur is not None:
+            self._close(events, keep_tail=self.pad_frames)
+        if self._turn_open:
+            events.append(("turn_end", self._last_voiced_wall if self._last_voiced_wall is not None else now))
+            self._turn_open = False
+        return events
+
+
+def split_speech(audio, sample_rate=16000, **kw):
+    """Offline: list SpeechSegment dari satu buffer (hening di awal/akhir/antar kalimat dibuang)."""
+    vad = EnergyVAD(sample_rate=sample_rate, **kw)
+    events = vad.feed(audio) + vad.flush()
+    return [seg for kind, seg in events if kind == "segment"]
@@ -1,22 +1,105 @@
+import os
 import time
 import threading
 import cv2
 import numpy as np
 import av
 from streamlit_webrtc import VideoProcessorBase
-from realtime_tts import speak_q, tts_busy
-import easyocr
+from frame_gate import SceneChangeGate
+from tracking import ObjectTracker
+from ocr_regions import OcrCache, clean_ocr, phash, select_ocr_regions
+from pipeline import LatestSlot, StageTimer
+from inference_service import get_inference_service
+from detector_backend import detector_config
+from overlay import OverlayState, draw_overlay
+from metrics import counter
+from load_controller import AdaptiveController
+from narration import NarrationState, build_sentence
+
+# Objek yang pantas diperingatkan kalau tiba-tiba dekat (box besar)
+ALERT_CLASSES = {"person", "bicycle", "car", "motorcycle", "bus", "truck"}
 
 class VideoProcessor(VideoProcessorBase):
-    def __init__(self, yolo_model, class_names, colors):
+    def __init__(self, yolo_model, class_names, colors, scene_threshold=None, scene_method=None,
+                 keyframe_interval=None, tracker_kind=None, inference=None, weights=None, imgsz=None,
+                 on_sentence=None):
         self.model = yolo_model
         self.names = class_names
         self.colors = colors
+        # Model ONNX/OpenVINO hasil export punya input statis, imgsz harus sama dengan saat export
+        self.imgsz = imgsz or detector_config()["imgsz"]
+
+        # Gate perubahan scene: threshold <= 0 berarti selalu deteksi
+        if scene_threshold is None and os.getenv("VISORA_SCENE_THRESHOLD"):
+            scene_threshold = float(os.getenv("VISORA_SCENE_THRESHOLD"))
+        scene_method = scene_method or os.getenv("VISORA_SCENE_METHOD", "diff")
+        self.gate = None
+        if scene_threshold is None or scene_threshold > 0:
+            self.gate = SceneChangeGate(threshold=scene_threshold, method=scene_method)
+        self.last_sentence = None
+        # "delta": hanya perubahan scene yang diucapkan; "full": kalimat lengkap tiap pass (perilaku lama)
+        self.narration_mode = os.getenv("VISORA_NARRATION", "delta").lower()
+        self.narration = NarrationState()
+        # Sink kalimat: default ke speak_q; benchmark/batch memasang callback(sentence, frame_ts)
+        # sehingga realtime_tts (sounddevice/PortAudio) tidak pernah di-import
+        self.on_sentence = on_sentence
+        # Peringatan "dekat": luas box >= alert_area dari frame, sekali per kemunculan
+        self.alert_area = float(os.getenv("VISORA_ALERT_AREA", "0.25"))
+        self.alert_cooldown = float(os.getenv("VISORA_ALERT_COOLDOWN", "5"))
+        self._alerted = {}
+
+        # Mode keyframe: YOLO penuh tiap N frame (atau saat scene berubah), di antaranya tracker.
+        # 0 = mode lama (YOLO tiap pass).
+        if keyframe_interval is None:
+            keyframe_interval = int(os.getenv("VISORA_KEYFRAME_INTERVAL", "0"))
+        self.keyframe_interval = keyframe_interval
+        self.tracker = None
+        if keyframe_interval > 0:
+            self.tracker = ObjectTracker(kind=tracker_kind or os.getenv("VISORA_TRACKER", "mosse"))
+        self._since_keyframe = 0
+
+        # Controller adaptif: interval/imgsz/OCR mengikuti beban (VISORA_ADAPTIVE=0 untuk mematikan).
+        # Model hasil export punya input statis, jadi imgsz hanya diturunkan untuk backend torch.
+        self.controller = None
+        if os.getenv("VISORA_ADAPTIVE", "1").lower() not in ("0", "false", "no"):
+            ladder = (self.imgsz,)
+            if detector_config()["backend"] == "torch":
+                ladder += tuple(sz for sz in (512, 416, 320) if sz < self.imgsz)
+            self.controller = AdaptiveController(
+                target_latency=float(os.getenv("VISORA_LATENCY_BUDGET", "0.5")),
+                imgsz_ladder=ladder,
+            )
 
         self._lock = threading.Lock()
         self.latest_frame = None
-        self.last_drawn = None
-        self.ocr_reader = easyocr.Reader(['id', 'en'], gpu=False)
+        self._frame_seq = 0
+        self._frame_ts = 0.0
+        self.last_ocr = []
+        self.last_labels = []
+        self._last_detections = []
+        self._ocr_ts = 0.0
+        # Teks OCR dianggap basi setelah sekian detik tanpa hasil baru
+        self.ocr_max_age = float(os.getenv("VISORA_OCR_MAX_AGE", "3"))
+        # Hasil terstruktur; recv menggambarnya di frame kamera terbaru
+        self.overlay = OverlayState(text_max_age=self.ocr_max_age)
+        # YOLO + OCR reader dipegang service bersama (satu per proses, bukan per sesi).
+        # inference="process": service meneruskan ke worker proses terpisah (hindari rebutan GIL dengan aiortc)
+        self.service = get_inference_service(yolo_model, imgsz=self.imgsz, inference=inference, weights=weights)
+        self._sid = self.service.register()
+        self.ocr_cache = OcrCache(
+            max_items=int(os.getenv("VISORA_OCR_CACHE_SIZE", "256")),
+            ttl=float(os.getenv("VISORA_OCR_CACHE_TTL", "30")),
+        )
+
+        # Stage: deteksi -> (slot latest-wins) -> OCR; narasi menggabungkan hasil terbaru keduanya
+        self._ocr_slot = LatestSlot(name="ocr")
+        self._narrate_lock = threading.Lock()
+        self.timers = {
+            "detect": StageTimer(metric="detect"),
+            "track": StageTimer(metric="track"),
+            "ocr": StageTimer(metric="ocr"),
+            "narrate": StageTimer(metric="narrate"),
+        }
 
         self.stop = False
 
@@ -24,94 +107,238 @@ class VideoProcessor(VideoProcessorBase):
             target=self._detector_loop,
             daemon=True
         ).start()
+        threading.Thread(
+            target=self._ocr_loop,
+            daemon=True
+        ).start()
+
+    def _detect(self, frame):
+        """List Detection, atau None kalau service tidak memberi hasil (frame ditimpa/di-drop)."""
+        imgsz = self.controller.imgsz if self.controller is not None else self.imgsz
+        return self.service.detect(self._sid, frame, imgsz=imgsz)
+
+    def _read_text(self, frame, detections):
+        """OCR hanya pada crop yang kemungkinan berisi teks, hasil di-cache per phash crop."""
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        per_box, misses = [], []
+        for x1, y1, x2, y2 in select_ocr_regions(gray, detections, self.names):
+            key = phash(gray[y1:y2, x1:x2])
+            found = self.ocr_cache.get(key)
+            if found is None:
+                misses.append((len(per_box), key, (x1, y1, x2, y2)))
+            per_box.append(found)
+        # Semua crop yang belum ada di cache dikirim dalam satu panggilan engine
+        if misses:
+            results_ocr = self._recognize(frame, gray, [box for _, _, box in misses])
+            for (i, key, _), res in zip(misses, results_ocr or ()):
+                if res is None:
+                    continue
+                per_box[i] = clean_ocr(res)
+                self.ocr_cache.put(key, per_box[i])
+        texts = []
+        for found in per_box:
+            for t in found or ():
+                if t not in texts:
+                    texts.append(t)
+        return texts
+
+    def _recognize(self, frame, gray, boxes):
+        return self.service.ocr(self._sid, frame, gray, boxes)
+
+    def _build_sentence(self, labels, ocr_texts):
+        return build_sentence(labels, ocr_texts)
+
+    def _full_pass(self, frame, ts):
+        """Keyframe: YOLO, publish hasil segera, OCR diserahkan ke stage OCR."""
+        with self.timers["detect"].time():
+            detections = self._detect(frame)
+            if detections is None:
+                return
+            if self.tracker is not None:
+                detections = self.tracker.on_keyframe(frame, detections)
+        self._since_keyframe = 0
+
+        self._last_detections = detections
+        self.last_labels = [self.names[d.cls] for d in detections]
+        self.overlay.update(detections, ts=ts)
+        if self.controller is not None:
+            self.controller.observe(time.time() - ts)
+
+        if self.controller is None or self.controller.ocr_enabled:
+            self._ocr_slot.put((frame, detections, ts))
+        self._check_alerts(frame, detections, ts)
+        self._narrate(ts, labels=self.last_labels)
+
+    def _check_alerts(self, frame, detections, ts):
+        """Peringatan prioritas tinggi saat orang/kendaraan muncul dekat kamera."""
+        h, w = frame.shape[:2]
+        now = time.time()
+        for d in detections:
+            label = self.names[d.cls]
+            if label not in ALERT_CLASSES:
+                continue
+            x1, y1, x2, y2 = d.box
+            if (x2 - x1) * (y2 - y1) < self.alert_area * w * h:
+                continue
+            key = d.id if d.id is not None else label
+            last = self._alerted.get(key)
+            self._alerted[key] = now
+            if last is None or now - last > self.alert_cooldown:
+                self._emit(f"Awas, {label} dekat di depan", ts, alert_key=f"alert:{label}")
+        # Buang objek yang sudah lama tidak terlihat dekat
+        for key in [k for k, t in self._alerted.items() if now - t > 4 * self.alert_cooldown]:
+            del self._alerted[key]
+
+    def _current_ocr(self):
+        if self.last_ocr and time.time() - self._ocr_ts > self.ocr_max_age:
+            self.last_ocr = []
+        return self.last_ocr
+
+    def _narrate(self, ts, labels=None, texts=None):
+        """Bangun narasi dari hasil stage terbaru.
+
+        Mode "delta": ``labels``/``texts`` (hasil pass yang baru selesai) dimasukkan ke NarrationState
+        dan hanya perubahannya yang diucapkan. Mode "full": label + teks OCR terbaru jadi satu kalimat.
+        ``ts`` = waktu frame sumber diterima recv (untuk latency frame -> kalimat).
+        """
+        with self._narrate_lock, self.timers["narrate"].time():
+            if self.narration_mode == "full":
+                self.last_sentence = self._build_sentence(self.last_labels, self._current_ocr())
+                if self.last_sentence:
+                    self._emit(self.last_sentence, ts)
+                return
+            parts = self.narration.update(labels=labels, texts=texts)
+            if parts:
+                sentence = ", ".join(parts)
+                self.last_sentence = sentence[0].upper() + sentence[1:]
+                self._emit(self.last_sentence, ts)
+
+    def _emit(self, sentence, ts, alert_key=None):
+        if self.on_sentence is not None:
+            self.on_sentence(sentence, ts)
+            return
+        from realtime_tts import speak_alert, speak_q
+
+        if alert_key is not None:
+            speak_alert(sentence, key=alert_key)
+        else:
+            speak_q.put_nowait(sentence)
+
+    def _ocr_loop(self):
+        while not self.stop:
+            item = self._ocr_slot.get(timeout=0.25)
+            if item is None:
+                continue
+            frame, detections, ts = item
+            try:
+                with self.timers["ocr"].time():
+                    texts = self._read_text(frame, detections)
+            except Exception as e:
+                print(f"[VP] OCR gagal: {e}")
+                continue
+            changed = texts != self.last_ocr
+            self.last_ocr = texts
+            self._ocr_ts = time.time()
+            self.overlay.set_texts(texts, ts=self._ocr_ts)
+            if changed or self.narration_mode != "full":
+                self._narrate(ts, texts=texts)
+
+    def stage_stats(self) -> dict:
+        stats = {name: t.stats() for name, t in self.timers.items()}
+        stats["ocr_queue"] = {"depth": self._ocr_slot.depth(), "dropped": self._ocr_slot.dropped}
+        if self.gate is not None:
+            stats["gate"] = self.gate.stats()
+        stats["service"] = self.service.stats()
+        if self.controller is not None:
+            stats["controller"] = self.controller.decisions()
+        return stats
+
+    def _interval(self):
+        return self.controller.interval if self.controller is not None else 0.2
+
+    def _log_stats(self):
+        if self.gate is not None:
+            gs = self.gate.stats()
+            print(f"[VP] scene gate: skip {gs['skipped']}/{gs['checked']} frame")
+        ts = {name: round(t.stats().get("p50_ms", 0.0), 1) for name, t in self.timers.items()}
+        print(f"[VP] stage p50 ms: {ts}, ocr dropped: {self._ocr_slot.dropped}")
+        print(f"[VP] service: {self.service.stats()}")
 
     def _detector_loop(self):
+        last_seq = -1
+        passes = 0
         while not self.stop:
             with self._lock:
-                if self.latest_frame is None:
-                    time.sleep(0.05)
-                    continue
-                frame = self.latest_frame.copy()
+                if self.latest_frame is None or (self.tracker is not None and self._frame_seq == last_seq):
+                    ready = False
+                else:
+                    ready = True
+                    last_seq = self._frame_seq
+                    ts = self._frame_ts
+                    # recv selalu mengganti array (tidak pernah mengubah isinya), jadi tidak perlu copy
+                    frame = self.latest_frame
+            if not ready:
+                time.sleep(0.05 if self.tracker is None else 0.01)
+                continue
 
-            results = self.model.predict(
-                frame,
-                imgsz=640,
-                conf=0.5,
-                verbose=False
-            )
+            changed = self.gate is None or self.gate.changed(frame)
+            passes += 1
+            if passes % 100 == 0:
+                self._log_stats()
+
+            if self.tracker is not None:
+                self._since_keyframe += 1
+                if changed or self._since_keyframe >= self.keyframe_interval:
+                    self._full_pass(frame, ts)
+                else:
+                    # Di antara keyframe: box dibawa maju oleh tracker pada frame kamera terbaru
+                    with self.timers["track"].time():
+                        tracks = self.tracker.update(frame)
+                    self._last_detections = tracks
+                    self.overlay.update(tracks, ts=ts)
+                continue
 
-            labels = []
-            img = frame.copy()
-
-            if results and results[0].boxes is not None:
-                for box, cls, conf in zip(
-                    results[0].boxes.xyxy.cpu().numpy(),
-                    results[0].boxes.cls.cpu().numpy(),
-                    results[0].boxes.conf.cpu().numpy(),
-                ):
-                    x1, y1, x2, y2 = box.astype(int)
-                    label = self.names[int(cls)]
-                    labels.append(label)
-
-                    color = self.colors[int(cls) % len(self.colors)]
-                    cv2.rectangle(img, (x1, y1), (x2, y2), color, 2)
-                    cv2.putText(
-                        img,
-                        f"{label} {conf:.2f}",
-                        (x1, y1 - 10),
-                        cv2.FONT_HERSHEY_SIMPLEX,
-                        0.6,
-                        color,
-                        2,
-                    )
-
-            ocr_texts = []
-            if labels:
-                gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-                results_ocr = self.ocr_reader.readtext(
-                    gray,
-                    detail=0,
-                    paragraph=True
-                )
-
-                ocr_texts = [t.strip() for t in results_ocr if len(t.strip()) > 2]
-
-            y = 30
-            for text in ocr_texts[:3]:
-                cv2.putText(
-                    img,
-                    text,
-                    (10, y),
-                    cv2.FONT_HERSHEY_SIMPLEX,
-                    0.7,
-                    (0, 255, 255),
-                    2
-                )
-                y += 30
-
-            parts = []
-
-            if labels:
-                parts.append("objek " + ", ".join(sorted(set(labels))))
-
-            if ocr_texts:
-                parts.append("teks " + ", ".join(ocr_texts))
-
-            if labels or ocr_texts:
-                sentence = "Saya melihat " + ", ".join(parts)
-                speak_q.put_nowait(sentence)
-
-            self.last_drawn = img
-            time.sleep(0.2)
+            if not changed:
+                counter("visora_scene_gate_skipped_total", "Frame yang dilewati gate scene").inc()
+                # Scene sama: pakai hasil deteksi sebelumnya, CPU dikembalikan
+                if self.narration_mode == "full" and self.last_sentence:
+                    self._emit(self.last_sentence, ts)
+                time.sleep(self._interval())
+                continue
+
+            self._full_pass(frame, ts)
+            time.sleep(self._interval())
 
     def recv(self, frame):
         img = frame.to_ndarray(format="bgr24")
 
+        now = time.time()
         with self._lock:
             self.latest_frame = img
-            out = self.last_drawn if self.last_drawn is not None else img
+            self._frame_seq += 1
+            self._frame_ts = now
+
+        # Overlay digambar di frame saat ini (bukan frame lama hasil deteksi), jadi video tetap
+        # di frame rate kamera. Copy hanya kalau ada yang digambar: img juga dibaca detektor.
+        items, texts = self.overlay.snapshot(now)
+        if items or texts:
+            out = draw_overlay(img.copy(), items, texts, self.names, self.colors)
+        else:
+            out = img
 
         return av.VideoFrame.from_ndarray(out, format="bgr24")
 
-    def __del__(self):
+    def close(self):
+        """Hentikan thread detektor/OCR dan lepas sesi dari InferenceService."""
+        if self.stop:
+            return
         self.stop = True
+        self.service.unregister(self._sid)
+
+    def on_ended(self):
+        # Dipanggil streamlit-webrtc saat stream berhenti (Stop Camera / sesi ditutup)
+        self.close()
+
+    def __del__(self):
+        # Cadangan saja: selama thread loop hidup, mereka memegang referensi ke self
+        self.close()
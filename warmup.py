@@ -0,0 +1,87 @@
+# warmup.py — muat model berat di thread latar, UI cukup membaca statusnya
+import threading
+import time
+from collections import OrderedDict
+
+from metrics import gauge
+
+
+class _Task:
+    __slots__ = ("name", "label", "fn", "state", "result", "error", "seconds", "event")
+
+    def __init__(self, name, label, fn):
+        self.name = name
+        self.label = label or name
+        self.fn = fn
+        self.state = "pending"
+        self.result = None
+        self.error = None
+        self.seconds = None
+        self.event = threading.Event()
+
+
+class Warmup:
+    """Jalankan task warm-up berurutan di satu thread (model CPU-bound tidak saling berebut core).
+
+    Urutan ``add`` = urutan prioritas. ``result(name)`` menunggu task itu selesai.
+    """
+
+    def __init__(self):
+        self._tasks = OrderedDict()
+        self._thread = None
+
+    def add(self, name, fn, label=None):
+        self._tasks[name] = _Task(name, label, fn)
+        return self
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        t_all = time.perf_counter()
+        for task in self._tasks.values():
+            task.state = "loading"
+            t0 = time.perf_counter()
+            try:
+                task.result = task.fn()
+                task.state = "ready"
+            except Exception as e:
+                task.error = e
+                task.state = "error"
+                print(f"[Warmup] {task.label} gagal: {e}")
+            task.seconds = time.perf_counter() - t0
+            gauge("visora_warmup_seconds", "Durasi warm-up per komponen", component=task.name).set(task.seconds)
+            print(f"[Warmup] {task.label}: {task.state} ({task.seconds:.1f}s)")
+            task.event.set()
+        print(f"[Warmup] selesai dalam {time.perf_counter() - t_all:.1f}s")
+
+    def ready(self, name) -> bool:
+        return self._tasks[name].state == "ready"
+
+    def result(self, name, timeout=None):
+        """Hasil task ``name`` (menunggu kalau belum selesai). Error task dilempar ulang."""
+        task = self._tasks[name]
+        if not task.event.wait(timeout):
+            raise TimeoutError(f"warm-up '{name}' belum selesai")
+        if task.error is not None:
+            raise task.error
+        return task.result
+
+    def done(self) -> bool:
+        return all(t.event.is_set() for t in self._tasks.values())
+
+    def progress(self) -> float:
+        if not self._tasks:
+            return 1.0
+        return sum(t.event.is_set() for t in self._tasks.values()) / len(self._tasks)
+
+    def status(self) -> list:
+        return [
+            {"name": t.name, "label": t.label, "state": t.state,
+             "seconds": round(t.seconds, 1) if t.seconds is not None else None,
+             "error": str(t.error) if t.error is not None else None}
+            for t in self._tasks.values()
+        ]